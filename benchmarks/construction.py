@@ -0,0 +1,81 @@
+""" Cost of building OSCApp container trees of different nesting depths
+
+        python -m benchmarks.construction [objects]
+
+    Nested containers used to be mapped into the app's dispatcher on construction
+    (OSCApp._map_methods); now their handlers are looked up in place when an address
+    is first resolved, so both construction and the first lookups are measured.
+"""
+import sys
+import time
+
+from ooposc.osc import OSCApp
+from ooposc.register import DynamicRegistrar, dispatchOSC, handleOSC
+
+
+DEPTHS = (1, 2, 3, 4)
+
+
+@dispatchOSC
+class Node(DynamicRegistrar):
+    def __init__(self, depth, fanout):
+        DynamicRegistrar.__init__(self)
+        self.level = 0.0
+        if depth > 1:
+            for i in range(fanout):
+                setattr(self, f"n{i}", Node(depth - 1, fanout))
+
+    @handleOSC()
+    def dim(self, level):
+        self.level = level
+
+    @handleOSC()
+    def on(self):
+        self.level = 1.0
+
+
+@dispatchOSC
+class Tree(OSCApp):
+    def __init__(self, depth, fanout):
+        OSCApp.__init__(self, 'tree')
+        for i in range(fanout):
+            setattr(self, f"n{i}", Node(depth, fanout))
+
+
+def fanout_for(objects, depth):
+    """ Fanout such that a tree of depth has about objects nodes """
+    return max(2, round(objects ** (1 / depth)))
+
+
+def measure(objects = 10000):
+    """ Return {depth: {'objects', 'construct' (ms), 'per_object' (µs), 'resolve' (µs)}} """
+    results = {}
+    for depth in DEPTHS:
+        fanout = fanout_for(objects, depth)
+        start = time.perf_counter()
+        tree = Tree(depth, fanout)
+        constructed = time.perf_counter() - start
+        nodes = sum(fanout ** d for d in range(1, depth + 1))
+
+        literal = ''.join(f"/n{fanout - 1}" for _ in range(depth)) + '/dim'
+        wildcard = '/n0' * (depth - 1) + '/*/dim'
+        start = time.perf_counter()
+        tuple(tree._dispatcher.handlers_for_address(literal))
+        tuple(tree._dispatcher.handlers_for_address(wildcard))
+        resolved = time.perf_counter() - start
+
+        results[depth] = {
+            'objects': nodes,
+            'construct': constructed * 1e3,
+            'per_object': constructed / nodes * 1e6,
+            'resolve': resolved / 2 * 1e6,
+        }
+    return results
+
+
+if __name__ == '__main__':
+    objects = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    for depth, r in measure(objects).items():
+        print(f"depth {depth}: {r['objects']} objects in {r['construct']:.1f} ms "
+              f"({r['per_object']:.1f} µs/object), first lookup {r['resolve']:.1f} µs")
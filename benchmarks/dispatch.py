@@ -0,0 +1,82 @@
+""" MethodDispatcher.handlers_for_address for different map sizes & wildcard densities
+
+        python -m benchmarks.dispatch [iterations]
+"""
+import sys
+import random
+import timeit
+
+from ooposc.osc import MethodDispatcher
+
+
+SIZES = (100, 1000, 10000)
+DENSITIES = (0.0, 0.1, 0.5)  # fraction of the looked up patterns that contain wildcards
+PATTERNS = 256
+
+
+def handler(*_):
+    pass
+
+
+def dispatcher(size, cache_size = None):
+    """ MethodDispatcher with size addresses: /group<g>/fixture<f>/<method> """
+    d = MethodDispatcher(cache_size = cache_size)
+    groups = max(1, size // 100)
+    for i in range(size):
+        d.map(f"/group{i % groups}/fixture{i // groups % 25}/m{i // groups // 25}", handler)
+    return d, groups
+
+
+def patterns(size, groups, density, rng):
+    """ PATTERNS address patterns to look up, density of them with wildcards """
+    result = []
+    for _ in range(PATTERNS):
+        g, f, m = rng.randrange(groups), rng.randrange(25), rng.randrange(max(1, size // groups // 25))
+        if rng.random() < density:
+            result.append(rng.choice((
+                f"/group{g}/*/m{m}",
+                f"/group{g}/fixture{f}/*",
+                f"/group{g}/fixture?/m{m}",
+                f"/group{{{g},{(g + 1) % groups}}}/fixture{f}/m{m}",
+            )))
+        else:
+            result.append(f"/group{g}/fixture{f}/m{m}")
+    return result
+
+
+def measure(iterations = 20, seed = 0):
+    """ Return {size: {density: {'cached': µs/lookup, 'uncached': µs/lookup, 'matches': n}}} """
+    rng = random.Random(seed)
+    results = {}
+    for size in SIZES:
+        results[size] = {}
+        for density in DENSITIES:
+            d, groups = dispatcher(size)
+            uncached, _ = dispatcher(size, cache_size = 0)
+            lookups = patterns(size, groups, density, rng)
+            matches = sum(len(tuple(d.handlers_for_address(p))) for p in lookups)  # warms the cache
+
+            def run(d = d):
+                for p in lookups:
+                    for _ in d.handlers_for_address(p):
+                        pass
+
+            cached = min(timeit.repeat(run, number = iterations, repeat = 3))
+            run = lambda d = uncached: [tuple(d.handlers_for_address(p)) for p in lookups]
+            resolved = min(timeit.repeat(run, number = max(1, iterations // 4), repeat = 3))
+            results[size][density] = {
+                'cached': cached / iterations / len(lookups) * 1e6,
+                'uncached': resolved / max(1, iterations // 4) / len(lookups) * 1e6,
+                'matches': matches / len(lookups),
+            }
+    return results
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    for size, densities in measure(iterations).items():
+        for density, r in densities.items():
+            print(f"{size:>6} addresses, {density:>4.0%} wildcards: "
+                  f"cached {r['cached']:.2f} µs, uncached {r['uncached']:.2f} µs, "
+                  f"{r['matches']:.1f} handlers/pattern")
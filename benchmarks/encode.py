@@ -0,0 +1,35 @@
+""" build_osc throughput: OscMessageBuilder vs. cached message templates
+
+        python -m benchmarks.encode [iterations]
+"""
+import sys
+import timeit
+
+from ooposc.encoding import build_message, _build_message
+
+
+MESSAGES = {
+    'fader': ('/mixer/channel/1/fader', [0.75]),
+    'xy': ('/pad/xy', [0.25, 0.5]),
+    'rgb': ('/fixture/12/rgb', [255, 128, 0]),
+    'mixed': ('/cue/go', [1, 0.5, True, None]),
+}
+
+
+def measure(iterations = 100000):
+    """ Return {name: (builder µs/message, template µs/message)} """
+    results = {}
+    for name, (address, values) in MESSAGES.items():
+        assert build_message(address, values) == _build_message(address, values)
+        builder = timeit.timeit(lambda: _build_message(address, values), number = iterations)
+        template = timeit.timeit(lambda: build_message(address, values), number = iterations)
+        results[name] = (builder / iterations * 1e6, template / iterations * 1e6)
+    return results
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    for name, (builder, template) in measure(iterations).items():
+        print(f"{name:>8}: OscMessageBuilder {builder:.2f} µs, "
+              f"template {template:.2f} µs ({builder / template:.1f}x)")
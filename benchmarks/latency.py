@@ -0,0 +1,112 @@
+""" End-to-end latency from send() to the handler being called, per transport
+
+        python -m benchmarks.latency [messages]
+
+    udp:        plain socket -> MulticastPythonOSC on 127.0.0.1
+    workers:    same, handled by a pool of 2 worker threads
+    virtual:    VirtualMulticastPythonOSC -> VirtualMulticastPythonOSC (multicast)
+    loopback:   LoopbackOSC -> LoopbackOSC (shared memory, no sockets)
+
+    Messages are sent one at a time, each after the previous one was handled.
+"""
+import sys
+import socket
+import threading
+import time
+
+from ooposc.osc import OSCApp, MulticastPythonOSC, VirtualMulticastPythonOSC, LoopbackOSC
+from ooposc.bus import LoopbackBus
+from ooposc.register import dispatchOSC, handleOSC
+
+
+TRANSPORTS = ('udp', 'workers', 'virtual', 'loopback')
+
+
+@dispatchOSC
+class Receiver(OSCApp):
+    def __init__(self):
+        OSCApp.__init__(self, 'receiver')
+        self.received = {}
+        self.event = threading.Event()
+
+    @handleOSC()
+    def ping(self, sequence):
+        self.received[sequence] = time.perf_counter()
+        self.event.set()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    pick = lambda p: samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1e6
+    return {
+        'count': len(samples),
+        'p50': pick(50), 'p90': pick(90), 'p99': pick(99), 'max': samples[-1] * 1e6,
+    }
+
+
+def connect(transport):
+    """ Return (receiver, send(sequence), close()) for a transport """
+    receiver = Receiver()
+    if transport in ('udp', 'workers'):
+        receiver.connect('', 0, MulticastPythonOSC, workers = 2 if transport == 'workers' else None)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda i: sock.sendto(MulticastPythonOSC.build_osc('/ping', [i]), ('127.0.0.1', 5001))
+        close = lambda: (sock.close(), receiver.server.server_close())
+    elif transport == 'virtual':
+        receiver.connect('', 0, VirtualMulticastPythonOSC)
+        sender = OSCApp('sender')
+        sender.connect('', 0, VirtualMulticastPythonOSC)
+        send = lambda i: sender.server.send('/ping', [i])
+        close = lambda: (sender.server.server_close(), receiver.server.server_close())
+    elif transport == 'loopback':
+        bus = LoopbackBus(slots = 2)
+        receiver.connect('', 0, LoopbackOSC, bus = bus, timeout = 0.1)
+        sender = OSCApp('sender')
+        sender.connect('', 0, LoopbackOSC, bus = bus)
+        send = lambda i: sender.server.send('/ping', [i])
+        close = lambda: (sender.server.close(), receiver.server.close(), bus.close())
+    else:
+        raise ValueError(f"transport should be one of {TRANSPORTS}, not '{transport}'")
+    receiver.server.timeout = 0.1
+    return receiver, send, close
+
+
+def measure(messages = 1000, transports = TRANSPORTS):
+    """ Return {transport: {'count', 'p50', 'p90', 'p99', 'max'}}, in µs """
+    results = {}
+    for transport in transports:
+        receiver, send, close = connect(transport)
+        running = True
+
+        def serve():
+            while running:
+                receiver.handle()
+
+        thread = threading.Thread(target = serve, daemon = True)
+        thread.start()
+
+        sent = {}
+        for i in range(messages + messages // 10):  # the first 10% warm up
+            receiver.event.clear()
+            sent[i] = time.perf_counter()
+            send(i)
+            receiver.event.wait(1.0)
+
+        running = False
+        thread.join()
+        close()
+        results[transport] = percentiles([
+            receiver.received[i] - sent[i] for i in sent
+            if i >= messages // 10 and i in receiver.received
+        ])
+    return results
+
+
+if __name__ == '__main__':
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    for transport, r in measure(messages).items():
+        print(f"{transport:>8}: p50 {r['p50']:.0f} µs, p90 {r['p90']:.0f} µs, "
+              f"p99 {r['p99']:.0f} µs, max {r['max']:.0f} µs ({r['count']} messages)")
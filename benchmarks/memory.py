@@ -0,0 +1,74 @@
+""" Memory used by an OSCApp holding a large rig of identical nested objects
+
+        python -m benchmarks.memory [fixtures] [groups]
+"""
+import sys
+import gc
+import tracemalloc
+
+from ooposc.osc import OSCApp
+from ooposc.register import DynamicRegistrar, dispatchOSC, handleOSC
+
+
+@dispatchOSC
+class Fixture(DynamicRegistrar):
+    def __init__(self):
+        DynamicRegistrar.__init__(self)
+        self.level = 0.0
+        self.color = (0, 0, 0)
+
+    @handleOSC()
+    def dim(self, level):
+        self.level = level
+
+    @handleOSC()
+    def rgb(self, r, g, b):
+        self.color = (r, g, b)
+
+    @handleOSC()
+    def on(self):
+        self.level = 1.0
+
+    @handleOSC()
+    def off(self):
+        self.level = 0.0
+
+
+@dispatchOSC
+class Group(DynamicRegistrar):
+    def __init__(self, fixtures):
+        DynamicRegistrar.__init__(self)
+        for i in range(fixtures):
+            setattr(self, f"fixture{i}", Fixture())
+
+    @handleOSC()
+    def blackout(self):
+        pass
+
+
+@dispatchOSC
+class Rig(OSCApp):
+    def __init__(self, fixtures, groups):
+        OSCApp.__init__(self, 'rig')
+        for i in range(groups):
+            setattr(self, f"group{i}", Group(fixtures // groups))
+
+
+def measure(fixtures = 10000, groups = 10):
+    gc.collect()
+    tracemalloc.start()
+    rig = Rig(fixtures, groups)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rig, current, peak
+
+
+if __name__ == '__main__':
+    fixtures = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    groups = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    _, current, peak = measure(fixtures, groups)
+    print(f"{fixtures} fixtures in {groups} groups: "
+          f"{current / 2**20:.1f} MiB ({current / fixtures:.0f} B/fixture), "
+          f"peak {peak / 2**20:.1f} MiB")
@@ -0,0 +1,87 @@
+""" Run all benchmarks & write the results as JSON, to compare them across commits
+
+        python -m benchmarks.suite [-o results.json] [--quick]
+        python -m benchmarks.suite --compare before.json after.json
+
+    Everything runs offline, on loopback / virtual sockets / shared memory.
+    Times are in µs unless the benchmark says otherwise; lower is better.
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+
+from benchmarks import construction, dispatch, encode, latency, memory
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True, check = True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(quick = False):
+    """ Return {'meta': {...}, benchmark: results} """
+    scale = 10 if quick else 1
+    results = {
+        'meta': {
+            'commit': commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': datetime.datetime.now().isoformat(timespec = 'seconds'),
+            'quick': quick,
+        },
+    }
+    results['dispatch'] = dispatch.measure(iterations = 20 // scale or 1)
+    results['construction'] = construction.measure(objects = 10000 // scale)
+    results['encode'] = {
+        name: {'builder': builder, 'template': template}
+        for name, (builder, template) in encode.measure(iterations = 100000 // scale).items()
+    }
+    results['latency'] = latency.measure(messages = 1000 // scale)
+    _, current, peak = memory.measure(fixtures = 10000 // scale, groups = 10)
+    results['memory'] = {'fixtures': 10000 // scale, 'current': current, 'peak': peak}
+    return results
+
+
+def _leaves(results, path = ()):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _leaves(value, path + (key,))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield '/'.join(path + (key,)), value
+
+
+def compare(before, after, threshold = 0.1):
+    """ Print the results that changed by more than threshold (relative) """
+    old = dict(_leaves({k: v for k, v in before.items() if k != 'meta'}))
+    for key, value in _leaves({k: v for k, v in after.items() if k != 'meta'}):
+        if key in old and old[key]:
+            change = value / old[key] - 1
+            if abs(change) > threshold:
+                print(f"{key}: {old[key]:.2f} -> {value:.2f} ({change:+.0%})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = __doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', help = 'write JSON here instead of to stdout')
+    parser.add_argument('--quick', action = 'store_true', help = 'fewer iterations, for smoke tests')
+    parser.add_argument('--compare', nargs = 2, metavar = ('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            compare(json.load(before), json.load(after))
+        sys.exit()
+
+    results = json.dumps(run(args.quick), indent = 2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results + '\n')
+    else:
+        print(results)
@@ -0,0 +1,210 @@
+import re
+import functools
+
+
+__PATTERN_CHARACTERS__ = frozenset('*?[]{}')
+
+
+class AddressNode:
+    """ Node in the OSC address space, one per '/'-separated segment
+
+            children:   literal segment -> AddressNode
+            handlers:   handler list of the address ending at this node (or None)
+            order:      registration order of the address, to yield handlers in the
+                        same order as a scan of the address map would
+    """
+    __slots__ = ('children', 'handlers', 'order')
+
+    def __init__(self):
+        self.children = {}
+        self.handlers = None
+        self.order = None
+
+
+@functools.lru_cache(maxsize = 4096)
+def compile_pattern_segment(segment):
+    """ Convert a segment of an incoming OSC address pattern into a regex
+
+            '?'         any single word character (or none, as python-osc did)
+            '*'         any sequence of word characters
+            '[a-z]'     any character in the list/range, '[!...]' negates
+            '{foo,bar}' any of the comma-separated strings
+
+        Malformed patterns (sent by anyone) match nothing rather than raise:
+
+            >>> compile_pattern_segment('[z-a]').fullmatch('m') is None
+            True
+            >>> compile_pattern_segment('f[1-3]').fullmatch('f2') is not None
+            True
+    """
+    out = []
+    i = 0
+    while i < len(segment):
+        c = segment[i]
+        if c == '?':
+            out.append(r'\w?')
+        elif c == '*':
+            out.append(r'[\w|\+]*')
+        elif c == '[' and segment.find(']', i + 1) > i + 1:
+            j = segment.find(']', i + 1)
+            body = segment[i + 1:j]
+            negate = body.startswith('!') and len(body) > 1
+            if negate:
+                body = body[1:]
+            body = ''.join(ch if ch == '-' else re.escape(ch) for ch in body)
+            out.append('[' + ('^' if negate else '') + body + ']')
+            i = j
+        elif c == '{' and segment.find('}', i + 1) > i:
+            j = segment.find('}', i + 1)
+            alternatives = segment[i + 1:j].split(',')
+            out.append('(?:' + '|'.join(re.escape(a) for a in alternatives) + ')')
+            i = j
+        else:
+            out.append(re.escape(c))
+        i += 1
+    try:
+        return re.compile(''.join(out))
+    except re.error:  # e.g. a reversed range: '[z-a]'
+        return _nothing
+
+
+_nothing = re.compile(r'(?!)')
+
+
+def compile_registered_address(address):
+    """ Convert a registered address containing '*' into a regex, as python-osc does
+
+            Each '*' matches any characters but '/', followed by any number of '/'s, the
+            rest of the address is used as a regex as-is, and the regex only has to
+            match the start of an incoming pattern: '/*b' matches '/x1/b' & '/a/b/c'.
+    """
+    return re.compile(address.replace('*', '[^/]*?/*'))
+
+
+class AddressTree:
+    """ Index of registered OSC addresses, keyed by '/'-separated segments
+
+            Literal segments resolve with a dict lookup, so matching a literal
+            address is O(depth) regardless of how many addresses are registered.
+            Wildcards in the incoming pattern only expand the subtrees they can match.
+
+            Registered addresses containing '*' keep python-osc's semantics (see
+            compile_registered_address()), which don't follow segments: they are kept
+            apart & each is tried against the incoming pattern as-is.
+    """
+
+    def __init__(self):
+        self._root = AddressNode()
+        self._starred = {}  # registered address containing '*': (regex, AddressNode)
+        self._count = 0
+
+    def __contains__(self, address):
+        node = self._find(address)
+        return node is not None and node.handlers is not None
+
+    def insert(self, address, handlers):
+        """ Register an address; handlers is a (mutable) list, which is kept by reference """
+        if '*' in address:
+            if address not in self._starred:
+                self._starred[address] = (compile_registered_address(address), AddressNode())
+            node = self._starred[address][1]
+        else:
+            node = self._root
+            for segment in address.split('/'):
+                if segment not in node.children:
+                    node.children[segment] = AddressNode()
+                node = node.children[segment]
+
+        if node.handlers is None:
+            node.order = self._count
+            self._count += 1
+        node.handlers = handlers
+
+    def handlers(self, address):
+        """ Return the handler list of a registered address """
+        return self._find(address).handlers
+
+    def remove(self, address):
+        """ Unregister an address, pruning branches that become empty """
+        if '*' in address:
+            self._starred.pop(address, None)
+            return
+
+        node = self._root
+        path = []
+        for segment in address.split('/'):
+            child = node.children.get(segment)
+            if child is None:
+                return
+            path.append((node, segment))
+            node = child
+
+        node.handlers = None
+        node.order = None
+        for parent, segment in reversed(path):
+            if node.handlers is not None or node.children:
+                break
+            del parent.children[segment]
+            node = parent
+
+    def match(self, address_pattern):
+        """ Return all handlers for addresses matching the given OSC pattern """
+        found = []
+        self._match(self._root, address_pattern.split('/'), 0, found)
+        self._match_starred(address_pattern, found)
+        return self._handlers(found)
+
+    def match_segments(self, segments, depth, literal = True):
+        """ Return all handlers for addresses matching the pattern segments[depth:]
+
+                Used for containers mounted at segments[:depth]; registered addresses
+                are absolute, i.e. start with '/'. Registered addresses containing '*'
+                only match if segments[:depth] were taken literally, as they would
+                have as part of the whole address.
+        """
+        found = []
+        start = self._root.children.get('')
+        if start is not None:
+            self._match(start, segments, depth, found)
+        if literal and self._starred:
+            self._match_starred('/' + '/'.join(segments[depth:]), found)
+        return self._handlers(found)
+
+    @staticmethod
+    def _handlers(found):
+        if len(found) > 1:
+            found.sort(key = lambda node: node.order)
+        return [handler for node in found for handler in node.handlers]
+
+    def _match(self, node, segments, depth, found):
+        if depth == len(segments):
+            if node.handlers:
+                found.append(node)
+            return
+
+        segment = segments[depth]
+        if __PATTERN_CHARACTERS__.isdisjoint(segment):
+            child = node.children.get(segment)
+            if child is not None:
+                self._match(child, segments, depth + 1, found)
+        else:
+            pattern = compile_pattern_segment(segment)
+            for key, child in node.children.items():
+                if pattern.fullmatch(key):
+                    self._match(child, segments, depth + 1, found)
+
+    def _match_starred(self, address_pattern, found):
+        for regex, node in self._starred.values():
+            if node.handlers and regex.match(address_pattern):
+                found.append(node)
+
+    def _find(self, address):
+        if '*' in address:
+            entry = self._starred.get(address)
+            return entry[1] if entry is not None else None
+        node = self._root
+        for segment in address.split('/'):
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
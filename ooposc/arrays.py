@@ -0,0 +1,90 @@
+import array
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # arrays are optional
+    np = None
+
+
+# Array blob: header, padded to a multiple of 8 bytes, followed by the raw data
+#   magic (3) | version (1) | length of dtype (1) | ndim (1) | dtype | shape (ndim x 4)
+__MAGIC__ = b'NDA'
+__VERSION__ = 1
+
+_header = struct.Struct('>3sBBB')
+_native = '<' if sys.byteorder == 'little' else '>'
+
+
+def is_array(value):
+    """ Whether value is sent as a single array blob: a NumPy array or a buffer
+        other than bytes (bytearray, memoryview, array.array)
+    """
+    return isinstance(value, (bytearray, memoryview, array.array)) \
+        or (np is not None and isinstance(value, np.ndarray))
+
+
+def _dtype(view):
+    """ NumPy dtype string (e.g. '<f4') for a memoryview's struct format """
+    fmt = view.format
+    order = _native
+    if fmt[0] in '@=<>!':
+        order = {'<': '<', '>': '>', '!': '>'}.get(fmt[0], _native)
+        fmt = fmt[1:]
+    if len(fmt) != 1 or fmt not in 'bBhHiIlLqQefd':
+        return None
+    kind = 'f' if fmt in 'efd' else ('i' if fmt.islower() else 'u')
+    if view.itemsize == 1:
+        order = '|'
+    return f"{order}{kind}{view.itemsize}"
+
+
+def encode_array(value):
+    """ Return (header, data) of the blob for an array; data is a flat memoryview of
+        value's memory, so the array isn't copied unless it isn't C-contiguous
+    """
+    if np is not None and isinstance(value, np.ndarray):
+        dtype, shape = value.dtype.str, value.shape
+        value = np.ascontiguousarray(value)  # no copy if it already is (but 0-d becomes 1-d)
+        view = memoryview(value.reshape(-1).view(np.uint8)) if value.size else memoryview(b'')
+    else:
+        view = memoryview(value)
+        dtype, shape = _dtype(view), view.shape
+        if dtype is None:  # not a plain numeric format: send the bytes
+            dtype, shape = '|u1', (view.nbytes,)
+        if not view.c_contiguous:
+            view = memoryview(view.tobytes())
+        view = view.cast('B') if view.nbytes else memoryview(b'')
+
+    dtype = dtype.encode('ascii')
+    header = _header.pack(__MAGIC__, __VERSION__, len(dtype), len(shape)) \
+        + dtype + struct.pack(f">{len(shape)}I", *shape)
+    return header + b'\x00' * (-len(header) % 8), view
+
+
+def is_array_blob(blob):
+    return blob[:4] == __MAGIC__ + bytes((__VERSION__,))
+
+
+def decode_array(blob):
+    """ Read-only np.ndarray view of an array blob (bytes) """
+    _, _, size, ndim = _header.unpack_from(blob)
+    offset = _header.size
+    dtype = blob[offset:offset + size].decode('ascii')
+    offset += size
+    shape = struct.unpack_from(f">{ndim}I", blob, offset)
+    offset += 4 * ndim
+    offset += -offset % 8
+    count = 1
+    for n in shape:
+        count *= n
+    return np.frombuffer(blob, dtype = dtype, count = count, offset = offset).reshape(shape)
+
+
+def decode_arrays(values):
+    """ Replace the array blobs among a message's arguments by np.ndarray views """
+    return [
+        decode_array(value) if isinstance(value, bytes) and is_array_blob(value) else value
+        for value in values
+    ]
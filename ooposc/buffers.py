@@ -0,0 +1,35 @@
+import threading
+
+
+class BufferPool:
+    """ Pool of preallocated, reusable receive buffers
+
+            acquire() allocates a new buffer when the pool is empty (counted in
+            allocated); release() keeps at most size buffers.
+    """
+    __SIZE__ = 64
+
+    def __init__(self, buffer_size, size = None):
+        if size is None:
+            size = self.__SIZE__
+        self.buffer_size = buffer_size
+        self.size = size
+        self._free = [bytearray(buffer_size) for _ in range(size)]
+        self._lock = threading.Lock()
+
+        self.allocated = size
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            self.allocated += 1
+        return bytearray(self.buffer_size)
+
+    def release(self, buffer):
+        with self._lock:
+            if len(self._free) < self.size:
+                self._free.append(buffer)
@@ -0,0 +1,120 @@
+import struct
+import threading
+
+
+IMMEDIATELY = 1  # OSC timetag
+__NTP_OFFSET__ = 2208988800  # seconds from 1900-01-01 (NTP) to 1970-01-01 (UNIX)
+
+_timetag = struct.Struct('>Q')
+_size = struct.Struct('>i')
+
+
+def ntp_timetag(timestamp = None):
+    """ Convert a time.time() timestamp to an OSC timetag; None means immediately """
+    if timestamp is None:
+        return IMMEDIATELY
+    seconds = timestamp + __NTP_OFFSET__
+    return (int(seconds) << 32) | int((seconds % 1) * (1 << 32))
+
+
+def bundle_parts(messages, timestamp = None):
+    """ OSC bundle of OSC messages (bytes), as a list of buffers to send without joining them """
+    parts = [b'#bundle\x00', _timetag.pack(ntp_timetag(timestamp))]
+    for message in messages:
+        parts.append(_size.pack(len(message)))
+        parts.append(message)
+    return parts
+
+
+def build_bundle(messages, timestamp = None):
+    """ Pack OSC messages (bytes) into an OSC bundle """
+    return b''.join(bundle_parts(messages, timestamp))
+
+
+class Bundler:
+    """ Collect outgoing OSC messages per destination & send them as OSC bundles
+
+            Pending messages for a destination are sent as soon as another one
+            wouldn't fit in a datagram of mtu bytes, and otherwise on flush(),
+            which is called every interval seconds if an interval is given.
+
+            A single pending message without a timetag is sent as-is.
+    """
+    __MTU__ = 1472  # UDP payload of a 1500 byte ethernet frame
+    __OVERHEAD__ = 16  # '#bundle\0' + timetag
+
+    def __init__(self, send, mtu = None, interval = None, timestamp = None):
+        """
+        :param send:        callback(datagram, address, port), where datagram is a list
+                            of buffers; address & port are None for multicast
+        :param mtu:         maximum datagram size
+        :param interval:    flush every interval seconds (from a background thread)
+        :param timestamp:   time.time() at which the receiver should handle the
+                            bundles; None for immediately
+        """
+        if mtu is None:
+            mtu = self.__MTU__
+        self.mtu = mtu
+        self.interval = interval
+        self.timestamp = timestamp
+
+        self._send = send
+        self._pending = {}  # (address, port) -> [size, [message, ...]]
+        self._lock = threading.Lock()
+
+        self.bundles = 0
+        self.messages = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        if interval:
+            self._thread = threading.Thread(
+                target = self._flush_periodically, name = 'OSCBundler', daemon = True
+            )
+            self._thread.start()
+
+    def add(self, message, address = None, port = None):
+        """ Queue a message for a destination """
+        with self._lock:
+            destination = (address, port)
+            pending = self._pending.get(destination)
+            if pending is None:
+                pending = self._pending[destination] = [self.__OVERHEAD__, []]
+            elif pending[0] + 4 + len(message) > self.mtu:
+                self._flush(destination, pending)
+
+            pending[0] += 4 + len(message)
+            pending[1].append(message)
+            self.messages += 1
+            if pending[0] >= self.mtu:
+                self._flush(destination, pending)
+
+    def flush(self):
+        """ Send all pending messages """
+        with self._lock:
+            for destination, pending in self._pending.items():
+                self._flush(destination, pending)
+
+    def close(self):
+        """ Stop flushing periodically & send all pending messages """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _flush(self, destination, pending):
+        messages = pending[1]
+        if not messages:
+            return
+        if len(messages) == 1 and self.timestamp is None:
+            datagram = messages
+        else:
+            datagram = bundle_parts(messages, self.timestamp)
+            self.bundles += 1
+        pending[0] = self.__OVERHEAD__
+        pending[1] = []
+        self._send(datagram, *destination)
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
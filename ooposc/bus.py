@@ -0,0 +1,206 @@
+import os
+import struct
+import multiprocessing
+from multiprocessing import shared_memory
+
+
+# Per-slot header in the shared memory block
+#   attached (1) | address (4) | port (2) | head (8) | tail (8), padded to 32 bytes
+_slot = struct.Struct('>?4sHQQ')
+__SLOT_HEADER__ = 32
+
+# Record in a slot's ring: size of the datagram (4) | sender address (4) | sender port (2)
+_record = struct.Struct('>I4sH')
+
+
+class BusFull(Exception):
+    """ A datagram didn't fit in a receiver's ring within the timeout """
+
+
+class LoopbackBus:
+    """ Shared-memory message bus connecting OSC interfaces without sockets
+
+            The bus is a multiprocessing.shared_memory block with a fixed number of
+            slots; every attached interface owns one slot, which holds a ring buffer
+            of incoming datagrams. Publishing copies a datagram into the ring of the
+            receiver (unicast) or of every other attached interface (multicast).
+
+            A full ring applies back-pressure: the publisher waits until the receiver
+            has read enough, or, with overflow = 'drop-newest', drops the datagram.
+
+            Pass the bus to child processes (e.g. as a multiprocessing.Process
+            argument) to connect apps across processes.
+    """
+    __SLOTS__ = 16
+    __CAPACITY__ = 1 << 16
+    __OVERFLOW_POLICIES__ = ('block', 'drop-newest')
+
+    def __init__(self, slots = None, capacity = None, overflow = 'block'):
+        """
+        :param slots:       Maximum number of attached interfaces
+        :param capacity:    Size in bytes of each interface's ring buffer
+        :param overflow:    'block' or 'drop-newest' when a receiver's ring is full
+        """
+        if overflow not in self.__OVERFLOW_POLICIES__:
+            raise ValueError(
+                f"overflow should be one of {self.__OVERFLOW_POLICIES__}, not '{overflow}'"
+            )
+        if slots is None:
+            slots = self.__SLOTS__
+        if capacity is None:
+            capacity = self.__CAPACITY__
+        self.slots = slots
+        self.capacity = capacity
+        self.overflow = overflow
+
+        self._memory = shared_memory.SharedMemory(
+            create = True, size = slots * (__SLOT_HEADER__ + capacity)
+        )
+        self._owner = os.getpid()  # forked or spawned processes don't free the memory
+        self._lock = multiprocessing.Lock()  # attaching & detaching
+        self._conditions = [multiprocessing.Condition() for _ in range(slots)]
+        self._dropped = multiprocessing.Value('L', 0)
+
+    @property
+    def dropped(self):
+        """ Number of datagrams dropped because a receiver's ring was full """
+        return self._dropped.value
+
+    def _header(self, slot):
+        return _slot.unpack_from(self._memory.buf, slot * __SLOT_HEADER__)
+
+    def _ring(self, slot):
+        return self.slots * __SLOT_HEADER__ + slot * self.capacity
+
+    def attach(self, address):
+        """ Claim a slot for (packed address, port); returns the slot, or None if the
+            address is already attached
+        """
+        with self._lock:
+            free = None
+            for slot in range(self.slots):
+                attached, host, port, _, _ = self._header(slot)
+                if attached and (host, port) == address:
+                    return None
+                if not attached and free is None:
+                    free = slot
+            if free is None:
+                raise RuntimeError(f"All {self.slots} slots of the bus are in use")
+            with self._conditions[free]:
+                _slot.pack_into(self._memory.buf, free * __SLOT_HEADER__, True, *address, 0, 0)
+            return free
+
+    def detach(self, slot):
+        with self._lock:
+            with self._conditions[slot]:
+                _slot.pack_into(self._memory.buf, slot * __SLOT_HEADER__, False, bytes(4), 0, 0, 0)
+                self._conditions[slot].notify_all()
+
+    def find(self, address):
+        """ Return the slot attached to (packed address, port), or None """
+        for slot in range(self.slots):
+            attached, host, port, _, _ = self._header(slot)
+            if attached and (host, port) == address:
+                return slot
+        return None
+
+    def publish(self, sender, datagram, to = None, timeout = None):
+        """ Copy a datagram into the ring of slot to, or of every other attached slot
+
+                Returns the number of receivers the datagram was delivered to.
+        """
+        host, port, _, _ = self._header(sender)[1:]
+        if to is None:
+            receivers = [
+                slot for slot in range(self.slots)
+                if slot != sender and self._header(slot)[0]
+            ]
+        else:
+            receivers = [to]
+
+        delivered = 0
+        for slot in receivers:
+            try:
+                if self._write(slot, datagram, host, port, timeout):
+                    delivered += 1
+            except BusFull:
+                with self._dropped.get_lock():
+                    self._dropped.value += 1
+        return delivered
+
+    def _write(self, slot, datagram, host, port, timeout):
+        size = _record.size + len(datagram)
+        if size > self.capacity:
+            raise ValueError(f"Datagram of {len(datagram)} bytes exceeds the bus capacity")
+        condition = self._conditions[slot]
+        with condition:
+            while True:
+                attached, _, _, head, tail = self._header(slot)
+                if not attached:
+                    return False
+                if self.capacity - (head - tail) >= size:
+                    break
+                if self.overflow == 'drop-newest' or not condition.wait(timeout):
+                    raise BusFull
+            self._copy_in(slot, head, _record.pack(len(datagram), host, port))
+            self._copy_in(slot, head + _record.size, datagram)
+            struct.pack_into('>Q', self._memory.buf, slot * __SLOT_HEADER__ + 7, head + size)
+            condition.notify_all()
+        return True
+
+    def _copy_in(self, slot, position, data):
+        ring = self._ring(slot)
+        offset = position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        buf = self._memory.buf
+        buf[ring + offset:ring + offset + first] = data[:first]
+        if first < len(data):
+            buf[ring:ring + len(data) - first] = data[first:]
+
+    def _copy_out(self, slot, position, size):
+        ring = self._ring(slot)
+        offset = position % self.capacity
+        if offset + size <= self.capacity:
+            return self._memory.buf[ring + offset:ring + offset + size]  # no copy
+        first = self.capacity - offset
+        buf = self._memory.buf
+        return bytes(buf[ring + offset:ring + self.capacity]) + bytes(buf[ring:ring + size - first])
+
+    def receive(self, slot, callback, timeout = None):
+        """ Wait for the next datagram in a slot's ring & call callback(datagram, address, port)
+
+                The datagram is a memoryview of the shared memory when it is contiguous
+                in the ring; it is only valid during the callback. Returns False if
+                nothing arrived within the timeout.
+        """
+        condition = self._conditions[slot]
+        with condition:
+            while True:
+                attached, _, _, head, tail = self._header(slot)
+                if not attached:
+                    return False
+                if head != tail:
+                    break
+                if not condition.wait(timeout):
+                    return False
+        # only this slot's owner moves its tail, so [tail, head) is stable
+        size, host, port = _record.unpack(bytes(self._copy_out(slot, tail, _record.size)))
+        datagram = self._copy_out(slot, tail + _record.size, size)
+        try:
+            callback(datagram, host, port)
+        finally:
+            if isinstance(datagram, memoryview):
+                datagram.release()
+            with condition:
+                struct.pack_into(
+                    '>Q', self._memory.buf, slot * __SLOT_HEADER__ + 15,
+                    tail + _record.size + size
+                )
+                condition.notify_all()
+        return True
+
+    def close(self):
+        """ Detach from the shared memory; the process that created the bus also frees it """
+        self._memory.close()
+        if self._owner == os.getpid():
+            self._memory.unlink()
@@ -0,0 +1,147 @@
+""" Record received datagrams to a file & replay them into an OSCApp, without sockets
+
+        python -m ooposc.capture capture.osc module:factory [--speed N | --fast]
+
+    factory is called without arguments and should return the OSCApp to replay into.
+"""
+import collections
+import logging
+import mmap
+import struct
+import threading
+import time
+
+from ooposc.stats import Histogram
+
+
+# File: magic (6) | version (1) | reserved (1), then records of
+#   time.monotonic() (8) | datagram size (4) | sender port (2) | sender address size (1)
+#   | sender address (utf-8) | datagram
+__MAGIC__ = b'OSCCAP'
+__VERSION__ = 1
+
+_file_header = struct.Struct('>6sBx')
+_record = struct.Struct('>dIHB')
+
+ReplayStats = collections.namedtuple(
+    typename = 'ReplayStats',
+    field_names = ('packets', 'bytes', 'elapsed', 'throughput', 'lag', 'errors')
+)
+
+
+class Capture:
+    """ Append received datagrams, with a monotonic timestamp & sender address, to a file """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(_file_header.pack(__MAGIC__, __VERSION__))
+        self._lock = threading.Lock()
+        self.packets = 0
+
+    def record(self, data, client_address):
+        host, port = client_address[:2]
+        host = str(host).encode('utf-8')[:255]
+        header = _record.pack(time.monotonic(), len(data), port, len(host))
+        with self._lock:
+            self._file.write(header)
+            self._file.write(host)
+            self._file.write(data)
+            self.packets += 1
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path):
+    """ Yield (time, client_address, datagram) from a capture file
+
+            The file is memory-mapped; each datagram is a memoryview of the map that
+            is released when the next record is read. A truncated last record (e.g.
+            from a crash while recording) is skipped.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as m:
+        view = memoryview(m)
+        try:
+            magic, version = _file_header.unpack_from(view)
+            if magic != __MAGIC__ or version != __VERSION__:
+                raise ValueError(f"{path} isn't a version {__VERSION__} OSC capture file")
+            offset = _file_header.size
+            while offset + _record.size <= len(view):
+                timestamp, size, port, host_size = _record.unpack_from(view, offset)
+                offset += _record.size
+                if offset + host_size + size > len(view):
+                    break
+                host = str(view[offset:offset + host_size], 'utf-8')
+                offset += host_size
+                datagram = view[offset:offset + size]
+                offset += size
+                try:
+                    yield timestamp, (host, port), datagram
+                finally:
+                    datagram.release()
+        finally:
+            view.release()
+
+
+def replay(app, path, speed = 1.0):
+    """ Dispatch the datagrams of a capture file to app
+
+            speed = 1.0 replays at the original timing, 2.0 twice as fast, and
+            None as fast as possible. Returns ReplayStats, with lag (how late
+            packets were dispatched) as a Histogram snapshot, in seconds, and the
+            number of packets whose handlers raised an exception (logged).
+    """
+    lag = Histogram()
+    packets = 0
+    size = 0
+    errors = 0
+    first = None
+    start = time.monotonic()
+    for timestamp, client_address, datagram in read_capture(path):
+        if first is None:
+            first = timestamp
+        now = time.monotonic()
+        if speed:
+            due = start + (timestamp - first) / speed
+            if due > now:
+                time.sleep(due - now)
+                now = time.monotonic()
+            lag.record(max(0.0, now - due))
+        try:
+            app._call_handlers_for_packet(datagram, client_address)
+        except Exception:
+            logging.exception('Replayed OSC handler raised an exception')
+            errors += 1
+        packets += 1
+        size += len(datagram)
+    elapsed = time.monotonic() - start
+    return ReplayStats(
+        packets, size, elapsed, packets / elapsed if elapsed else 0.0, lag.snapshot(), errors
+    )
+
+
+if __name__ == '__main__':
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description = 'Replay an OSC capture file into an OSCApp')
+    parser.add_argument('path')
+    parser.add_argument('factory', help = 'module:callable returning the OSCApp')
+    parser.add_argument('--speed', type = float, default = 1.0)
+    parser.add_argument('--fast', action = 'store_true', help = 'as fast as possible')
+    args = parser.parse_args()
+
+    module, _, name = args.factory.partition(':')
+    app = getattr(importlib.import_module(module), name)()
+    stats = replay(app, args.path, None if args.fast else args.speed)
+    print(f"{stats.packets} packets ({stats.bytes} bytes) in {stats.elapsed:.3f} s: "
+          f"{stats.throughput:.0f} packets/s, lag p50 {stats.lag['p50'] * 1e3:.2f} ms, "
+          f"p99 {stats.lag['p99'] * 1e3:.2f} ms, max {stats.lag['max'] * 1e3:.2f} ms, "
+          f"{stats.errors} errors")
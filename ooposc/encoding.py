@@ -0,0 +1,116 @@
+import struct
+import functools
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from ooposc.arrays import is_array, encode_array
+
+
+# Arguments with a fixed-size encoding: type (or value) -> (OSC type tag, struct format)
+__FIXED_TYPES__ = {
+    float: ('f', 'f'),
+    int: ('i', 'i'),
+    True: ('T', ''),  # booleans & None are encoded in the type tags only
+    False: ('F', ''),
+    type(None): ('N', ''),
+}
+__INT32_MIN__ = -2 ** 31  # python-osc encodes this one as an int64
+
+_size = struct.Struct('>i')
+
+
+def _osc_string(value):
+    encoded = value.encode('utf-8')
+    return encoded + b'\x00' * (4 - len(encoded) % 4)
+
+
+class MessageTemplate:
+    """ Precompiled OSC message for an address & argument signature
+
+            The address and type tags are encoded once; building a message is a
+            single struct.pack of the pre-encoded header & the argument values.
+    """
+    __slots__ = ('struct', 'header', 'packed', 'ints')
+
+    def __init__(self, osc_address, signature):
+        typetags = ''
+        fmt = ''
+        self.packed = []  # indices of the arguments that are encoded in the payload
+        self.ints = []
+        for i, t in enumerate(signature):
+            tag, code = __FIXED_TYPES__[t]
+            typetags += tag
+            fmt += code
+            if code:
+                self.packed.append(i)
+            if code == 'i':
+                self.ints.append(i)
+        self.header = _osc_string(osc_address) + _osc_string(',' + typetags)
+        self.struct = struct.Struct(f">{len(self.header)}s{fmt}")
+
+    def build(self, values):
+        for i in self.ints:
+            if values[i] == __INT32_MIN__:
+                raise OverflowError
+        return self.struct.pack(self.header, *[values[i] for i in self.packed])
+
+
+@functools.lru_cache(maxsize = 4096)
+def template(osc_address, signature):
+    """ Return the MessageTemplate for an address & argument signature """
+    return MessageTemplate(osc_address, signature)
+
+
+def signature_of(values):
+    """ Argument types, except for booleans, which are taken by value """
+    signature = tuple(map(type, values))
+    if bool in signature:
+        signature = tuple(v if t is bool else t for v, t in zip(values, signature))
+    return signature
+
+
+def build_message(osc_address, values):
+    """ Encode an OSC message, byte-identical to pythonosc's OscMessageBuilder
+
+            Messages whose arguments are all floats, 32-bit ints, booleans or None
+            are built from a cached MessageTemplate; anything else goes through
+            OscMessageBuilder.
+
+            Arrays (see ooposc.arrays.is_array) are encoded as single blobs.
+    """
+    signature = signature_of(values)
+    for t in signature:
+        if t not in __FIXED_TYPES__:
+            if any(map(is_array, values)):
+                return _build_with_arrays(osc_address, values)
+            return _build_message(osc_address, values)
+    try:
+        return template(osc_address, signature).build(values)
+    except (struct.error, OverflowError):  # int out of 32-bit range
+        return _build_message(osc_address, values)
+
+
+def _build_with_arrays(osc_address, values):
+    """ Encode a message with array blobs; each array's memory is copied once, into the message """
+    typetags = ','
+    parts = []
+    for value in values:
+        if is_array(value):
+            header, data = encode_array(value)
+            size = len(header) + data.nbytes
+            typetags += 'b'
+            parts += (_size.pack(size), header, data, b'\x00' * (-size % 4))
+        else:
+            # encode the argument on its own & take its type tag(s) & payload
+            encoded = build_message('/', [value])
+            end = encoded.index(b'\x00', 4)
+            typetags += encoded[5:end].decode('ascii')
+            parts.append(encoded[(end & ~3) + 4:])
+    return b''.join([_osc_string(osc_address), _osc_string(typetags)] + parts)
+
+
+def _build_message(osc_address, values):
+    builder = OscMessageBuilder(address = osc_address)
+    for value in values:
+        builder.add_arg(value)
+    return builder.build().dgram
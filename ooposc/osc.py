@@ -1,13 +1,30 @@
 from pythonosc.osc_server import ThreadingOSCUDPServer, BlockingOSCUDPServer
-from collections import Iterable
-from pythonosc.osc_message_builder import OscMessageBuilder
+from collections.abc import Iterable
 
 import struct
 import socket
+import select
+import selectors
+import os
 from abc import ABCMeta, abstractmethod
 
-from ooposc.virtualsocket import VirtualSocket
-from ooposc.register import DynamicRegistrar, dispatchOSC, handleOSC
+from ooposc.virtualsocket import VirtualSocket, is_envelope, is_virtual, pack_address, unpack_address
+from ooposc.addresstree import AddressTree
+from ooposc.scheduler import TimetagScheduler
+from ooposc.stats import DispatchStats
+from ooposc.replication import Replicator
+from ooposc.bundling import Bundler
+from ooposc.capture import Capture
+from ooposc.encoding import build_message
+from ooposc.arrays import is_array, decode_arrays
+from ooposc.workers import WorkerPool, BoundedQueue, COALESCED, shard_of
+from ooposc.parsing import parse_packet, osc_address_of, is_bundle, message_address
+from ooposc.buffers import BufferPool
+from ooposc.bus import LoopbackBus
+from ooposc.sending import SendSockets, buffers
+from ooposc.stream import FRAMINGS, StreamConnection
+from ooposc.register import DynamicRegistrar, dispatchOSC, handleOSC, \
+    namespace_handlers, namespace_version
 
 from pythonosc import dispatcher
 from pythonosc import osc_packet
@@ -15,12 +32,13 @@ import socketserver
 
 import time
 import asyncio
+import multiprocessing
 import threading
+import contextlib
+import functools
 
 import collections
 
-import re
-
 import logging
 
 
@@ -86,52 +104,196 @@ MethodHandler = collections.namedtuple(
     field_names = ('callback', 'instance', 'args')
 )
 
+_UNRESOLVED = object()
+
+
+def typed_invoker(handler):
+    """ Bind a handler in advance: invoke(client_address, arguments) """
+    method = handler.callback
+    if hasattr(handler, 'instance'):
+        method = functools.partial(method, handler.instance)
+    if handler.callback._pass_address:
+        return lambda client_address, arguments: method(client_address, *arguments)
+    return lambda client_address, arguments: method(*arguments)
+
+
+def compile_typed(handlers):
+    """ Return (Signature, invokers) if all handlers declared the same @handleOSC(types = ...)
+        & need nothing else from the message (coalescing, arrays), or None
+    """
+    signatures = [getattr(handler.callback, '_signature', None) for handler in handlers]
+    if not signatures or None in signatures \
+            or len({signature.types for signature in signatures}) != 1:
+        return None
+    if any(getattr(handler.callback, '_coalesce', False) or getattr(handler.callback, '_arrays', False)
+           for handler in handlers):
+        return None
+    return signatures[0], tuple(typed_invoker(handler) for handler in handlers)
+
+
+CacheInfo = collections.namedtuple(
+    typename = 'CacheInfo',
+    field_names = ('hits', 'misses', 'maxsize', 'currsize')
+)
+
 class MethodDispatcher(dispatcher.Dispatcher):
-    def _init__(self):
+    __CACHE_SIZE__ = 1024
+
+    def __init__(self, cache_size = None, namespace = None):
+        """
+        :param cache_size:      Maximum number of resolved address patterns to keep.
+                                Least recently used patterns are evicted first;
+                                0 disables the cache.
+        :param namespace:       Root OSC container (e.g. an OSCApp); handlers of the
+                                container and its nested containers are looked up
+                                in place, next to the explicitly mapped ones.
+        """
         dispatcher.Dispatcher.__init__(self)
         self._default_instance = None
+        self._tree = AddressTree()
+        self._namespace = namespace
+        self._namespace_version = namespace_version(namespace)
+
+        if cache_size is None:
+            cache_size = self.__CACHE_SIZE__
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._typed = collections.OrderedDict()  # address pattern: compile_typed(handlers)
+        self.typed = False  # whether a resolved handler declared @handleOSC(types = ...)
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def map(self, address, handler, *args, **kwargs):
+        handler = dispatcher.Dispatcher.map(self, address, handler, *args, **kwargs)
+        self._index(address)
+        self.cache_clear()
+        return handler
+
+    def unmap(self, address, handler, *args, **kwargs):
+        dispatcher.Dispatcher.unmap(self, address, handler, *args, **kwargs)
+        self.cache_clear()
 
     def map_method(self, address, handler, instance, *args):
         self._map[address].append(MethodHandler(handler, instance, list(args)))
+        self._index(address)
+        self.cache_clear()
+
+    def unmap_method(self, address, handler, instance):
+        """ Remove the handler(s) mapped with map_method(address, handler, instance) """
+        handlers = self._map.get(address)
+        if handlers is None:
+            return
+        handlers[:] = [
+            h for h in handlers
+            if not (getattr(h, 'instance', None) is instance and h.callback is handler)
+        ]
+        if not handlers:
+            del self._map[address]
+            self._tree.remove(address)
+        self.cache_clear()
+
+    def _index(self, address):
+        """ Add a newly mapped address to the address tree """
+        if address not in self._tree:
+            self._tree.insert(address, self._map[address])
+
+    def cache_info(self):
+        """ Return hit/miss counters & current size of the address pattern cache """
+        with self._cache_lock:
+            return CacheInfo(
+                self._cache_hits, self._cache_misses,
+                self._cache_size, len(self._cache)
+            )
+
+    def cache_clear(self):
+        """ Invalidate all resolved address patterns (counters are kept) """
+        with self._cache_lock:
+            self._cache.clear()
+            self._typed.clear()
+            self._cache_generation += 1
 
     def handlers_for_address(self, address_pattern):
         """yields Handler namedtuples matching the given OSC pattern.
-                Copied from python-osc todo: add which release!
-        """
-        # First convert the address_pattern into a matchable regexp.
-        # '?' in the OSC Address Pattern matches any single character.
-        # Let's consider numbers and _ "characters" too here, it's not said
-        # explicitly in the specification but it sounds good.
-        escaped_address_pattern = re.escape(address_pattern)
-        pattern = escaped_address_pattern.replace('\\?', '\\w?')
-        # '*' in the OSC Address Pattern matches any sequence of zero or more
-        # characters.
-        pattern = pattern.replace('\\*', '[\w|\+]*')
-        # The rest of the syntax in the specification is like the re module so
-        # we're fine.
-        pattern = pattern + '$'
-        pattern = re.compile(pattern)
-        matched = False
-
-        for addr, handlers in self._map.items():
-            if (pattern.match(addr)
-                    or (('*' in addr)
-                        and re.match(
-                                addr.replace('*', '[^/]*?/*'),
-                                address_pattern
-                            )
-                    )
-            ):
-                yield from handlers
-                matched = True
 
-        if not matched and self._default_handler:
+            Resolved handler lists are kept in a bounded LRU cache, which is
+            invalidated whenever the address map changes.
+        """
+        with self._cache_lock:
+            version = namespace_version(self._namespace)
+            if self._namespace_version != version:
+                # a container in the namespace gained, replaced or lost a nested container
+                self._namespace_version = version
+                self._cache.clear()
+                self._typed.clear()
+                self._cache_generation += 1
+            generation = self._cache_generation
+            handlers = self._cache.get(address_pattern)
+            if handlers is not None:
+                self._cache.move_to_end(address_pattern)
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+
+        if handlers is None:
+            handlers = tuple(self._resolve(address_pattern))
+            if not self.typed:
+                self.typed = any(
+                    hasattr(handler.callback, '_signature') for handler in handlers
+                )
+            with self._cache_lock:
+                # don't store handlers resolved against a map that changed meanwhile
+                if self._cache_size and generation == self._cache_generation:
+                    self._cache[address_pattern] = handlers
+                    if len(self._cache) > self._cache_size:
+                        self._cache.popitem(last = False)
+
+        if handlers:
+            yield from handlers
+        elif self._default_handler:
             logging.debug('No handler matched but default handler present, '
                           'added it.')
             yield MethodHandler(
                 self._default_handler, self._default_instance, []
             )
 
+    def typed_handlers(self, address_pattern):
+        """ Return (Signature, invokers) for the handlers of an OSC pattern if they all
+            declared the same @handleOSC(types = ...), see compile_typed(), or None
+
+                Invokers are compiled when the pattern is first resolved & cached
+                alongside the resolved handlers.
+        """
+        with self._cache_lock:
+            typed = _UNRESOLVED
+            if self._namespace_version == namespace_version(self._namespace):
+                typed = self._typed.get(address_pattern, _UNRESOLVED)
+            generation = self._cache_generation
+        if typed is not _UNRESOLVED:
+            return typed
+
+        typed = compile_typed(tuple(self.handlers_for_address(address_pattern)))
+        with self._cache_lock:
+            if self._cache_size and generation == self._cache_generation:
+                self._typed[address_pattern] = typed
+                if len(self._typed) > self._cache_size:
+                    self._typed.popitem(last = False)
+        return typed
+
+    def _resolve(self, address_pattern):
+        """ Look up handlers matching the given OSC pattern in the namespace & address tree """
+        handlers = []
+        if self._namespace is not None:
+            handlers.extend(
+                MethodHandler(method, instance, [method._kwargs])
+                for method, instance in namespace_handlers(
+                    self._namespace, address_pattern.split('/')
+                )
+            )
+        handlers.extend(self._tree.match(address_pattern))
+        return handlers
+
     def set_default_handler(self, handler):
         """Sets the default handler.
 
@@ -145,95 +307,305 @@ class MethodDispatcher(dispatcher.Dispatcher):
 class OSCApp(DynamicRegistrar):
     """ Method registering & dispatching class
 
-            Maps all registered OSC handler methods to a pythonosc Dispatcher
+            Resolves OSC addresses to the registered handler methods of itself and
+            its nested containers, through a pythonosc-compatible Dispatcher
     """
-    def __init__(self, name):
+    def __init__(self, name, late_policy = 'run'):
+        """
+        :param name:
+        :param late_policy:     What to do with bundles that are handled too late,
+                                or arrive too late: 'run', 'drop' or 'log'
+        """
         DynamicRegistrar.__init__(self)
         self.name = name
-        self._dispatcher = MethodDispatcher()
-        self._map_methods()
+        self._dispatcher = MethodDispatcher(namespace = self)
+        self.scheduler = TimetagScheduler(late_policy)
+        self._tasks = set()
 
-    def _map_methods(self):
-        """ Maps OSC handler methods from self._handler_registry to a Dispatcher (adapted from pythonosc) """
-        implementations = [self.__class__.__name__]
-        for base in self.__class__.__bases__:
-            implementations.append(base.__name__)
-
-        if not '_mapped' in self._instance_handlers.keys():
-            self._instance_handlers['_mapped'] = {}
-
-        for implementation in implementations: # todo: clean up!
-            try:
-                if not implementation in self._instance_handlers['_mapped'] \
-                        and implementation in self._instance_handlers.keys():
-                    self._instance_handlers['_mapped'][implementation] = {}
-
-                handlers = self._instance_handlers[implementation].items()
-                for address, handler in list(handlers):
-                    if address not in self._instance_handlers['_mapped'][implementation]:
-                        if isinstance(handler, tuple):  # handler is a (method, instance)
-                            method = handler[0]
-                            instance = handler[1]
-                        else:
-                            method = handler  # made obsolete by RegisteringObject.__init__()...
-                            instance = self
-
-                        self._dispatcher.map_method(address, method, instance, method._kwargs)
-
-                        self._instance_handlers['_mapped'][implementation].update(
-                            {address: self._instance_handlers[implementation].pop(address)}
-                        )
-            except KeyError:
-                pass  # no methods registered for OSC in this class
+        self.stats = None  # see enable_stats()
+        self.replicator = None  # see enable_replication()
+        self.coalesced = collections.Counter()  # dropped messages per OSC address
+        self.rejected = collections.Counter()  # messages not matching @handleOSC(types = ...)
+        self._coalescing = {}
+        self._coalesce_lock = threading.Lock()
 
     def map_function(self, address, handler, *args):
-        self._dispatcher.map(address, handler, args)
+        return self._dispatcher.map(address, handler, args)
 
     def _call_handlers_for_packet(self, data, client_address):
         """ Call OSC handler methods by packet's OSC address (adapted from python-osc todo: add version) """
+        if self._dispatcher.typed and self.stats is None and not is_bundle(data) \
+                and self._call_typed(data, client_address):
+            return
         try:
-            packet = osc_packet.OscPacket(data)
+            now = time.time()
+            messages = parse_packet(data, now)
             # todo: search nested objects at this level: for all dispatching objects in self:
             # todo: MAKE THIS _call_handlers for all subobjects and _call_handlers_for_packet for all others.
-            for timed_msg in packet.messages:
-                now = time.time()
-                handlers = self._dispatcher.handlers_for_address( # todo: or maybe override this thing even
-                    timed_msg.message.address)
+            stats = self.stats
+            scheduled = {}
+            for timed_msg in messages:
+                if stats is not None:
+                    resolving = time.perf_counter()
+                handlers = tuple(self._dispatcher.handlers_for_address( # todo: or maybe override this thing even
+                    timed_msg.message.address))
+                if stats is not None:
+                    resolved = time.perf_counter()
                 if not handlers:
+                    if stats is not None:
+                        stats.record(timed_msg.message.address, resolved - resolving)
                     continue
-                # If the message is to be handled later, then so be it.
+                # If the message is to be handled later, leave it to the scheduler.
                 if timed_msg.time > now:
-                    time.sleep(timed_msg.time - now)
-                for handler in handlers:
-                    method = handler.callback
-                    if hasattr(handler, 'instance'):
-                        instance = handler.instance
-                        # if len(handler.args): # todo: assuming this will never be used
-                        #     method(instance, handler.args, *timed_msg.message)
-                        if method._pass_address:
-                            method(instance, client_address, *timed_msg.message)
-                        else:
-                            method(instance, *timed_msg.message)
-                    else:
-                        # if handler.args == True: # todo: assuming this will never be used
-                        #     method(handler.args, *timed_msg.message)
-                        if method._pass_address:
-                            method(client_address, *timed_msg.message)
-                        else:
-                            method(*timed_msg.message)
+                    scheduled.setdefault(timed_msg.time, []).append(
+                        (handlers, timed_msg.message)
+                    )
+                    if stats is not None:
+                        stats.record(timed_msg.message.address, resolved - resolving)
+                elif now - timed_msg.time > self.scheduler.late_tolerance \
+                        and not self.scheduler.admit_late(timed_msg.time):
+                    if stats is not None:
+                        stats.record(timed_msg.message.address, resolved - resolving)
+                else:
+                    self._call_handlers(handlers, timed_msg.message, client_address)
+                    if stats is not None:
+                        stats.record(
+                            timed_msg.message.address, resolved - resolving,
+                            time.perf_counter() - resolved
+                        )
+
+            # one scheduler entry per timetag, rather than per message of a bundle
+            for timestamp, messages in scheduled.items():
+                self.scheduler.schedule(
+                    timestamp, self._call_scheduled, messages, client_address
+                )
         except osc_packet.ParseError:
             print('Parse Error!')
             pass
 
-    def __setattr__(self, key, value):
-        """ Add attribute and re-map all registered methods """
-        # todo: don't need a full remap
-        DynamicRegistrar.__setattr__(self, key, value)
-        if hasattr(value, '_instance_handler_registry'):
-            self._map_methods()
+    def _call_typed(self, data, client_address):
+        """ Fast path for messages whose handlers all declared @handleOSC(types = ...):
+            arguments are decoded straight from the datagram & passed to precompiled invokers
 
-    def connect(self, address, send_port, OSCServer = OSCInterface):
-        self.server = OSCServer(self, address, send_port)
+                Only tried once the dispatcher resolved such a handler, so that apps
+                without typed handlers don't pay for it.
+                Returns False if the datagram should be dispatched the generic way.
+        """
+        view = memoryview(data)
+        address, index = message_address(view)
+        if address is None:
+            return False
+        typed = self._dispatcher.typed_handlers(address)
+        if typed is None:
+            return False
+        signature, invokers = typed
+        arguments = signature.unpack(view, index)
+        if arguments is None:
+            self._count_rejected(address)
+            return True
+        for invoke in invokers:
+            result = invoke(client_address, arguments)
+            if result is not None and asyncio.iscoroutine(result):
+                self._run_coroutine(result)
+        return True
+
+    def _call_scheduled(self, messages, client_address):
+        """ Call OSC handler methods for the messages of a bundle that was scheduled """
+        for handlers, message in messages:
+            self._call_handlers(handlers, message, client_address)
+
+    def _call_handlers(self, handlers, message, client_address):
+        """ Call OSC handler methods for a single message """
+        for handler in handlers:
+            signature = getattr(handler.callback, '_signature', None)
+            if signature is not None and not signature.matches(message):
+                self._count_rejected(message.address)
+                continue
+
+            if getattr(handler.callback, '_coalesce', False):
+                self._call_coalescing(handler, message, client_address)
+                continue
+
+            result = self._call_handler(handler, message, client_address)
+            if result is not None and asyncio.iscoroutine(result):
+                self._run_coroutine(result)
+
+    def _call_handler(self, handler, message, client_address):
+        method = handler.callback
+        if getattr(method, '_arrays', False):
+            message = decode_arrays(message)
+        if hasattr(handler, 'instance'):
+            instance = handler.instance
+            # if len(handler.args): # todo: assuming this will never be used
+            #     method(instance, handler.args, *message)
+            if method._pass_address:
+                return method(instance, client_address, *message)
+            else:
+                return method(instance, *message)
+        else:
+            # if handler.args == True: # todo: assuming this will never be used
+            #     method(handler.args, *message)
+            if method._pass_address:
+                return method(client_address, *message)
+            else:
+                return method(*message)
+
+    def _call_coalescing(self, handler, message, client_address):
+        """ Call a handler registered with coalesce = True
+
+                While the handler is busy with a message for this address, newer
+                messages replace each other; only the latest one is handled next.
+        """
+        key = (handler.callback, id(getattr(handler, 'instance', None)), message.address)
+        with self._coalesce_lock:
+            slot = self._coalescing.get(key)
+            if slot is not None:  # busy: leave the newest message for it
+                if slot[0] is not None:
+                    self.coalesced[message.address] += 1
+                slot[0] = (message, client_address)
+                return
+            self._coalescing[key] = [None]
+
+        try:
+            result = self._call_handler(handler, message, client_address)
+            while not (result is not None and asyncio.iscoroutine(result)):
+                pending = self._next_coalesced(key)
+                if pending is None:
+                    return
+                result = self._call_handler(handler, *pending)
+        except BaseException:
+            with self._coalesce_lock:
+                self._coalescing.pop(key, None)
+            raise
+
+        # async handler: it's busy until the coroutine is done
+        self._run_coroutine(self._await_coalescing(key, handler, result))
+
+    async def _await_coalescing(self, key, handler, coroutine):
+        try:
+            await coroutine
+            while True:
+                pending = self._next_coalesced(key)
+                if pending is None:
+                    return
+                result = self._call_handler(handler, *pending)
+                if result is not None and asyncio.iscoroutine(result):
+                    await result
+        except BaseException:
+            with self._coalesce_lock:
+                self._coalescing.pop(key, None)
+            raise
+
+    def _next_coalesced(self, key):
+        """ Take the pending message for a coalescing handler, or mark it as idle """
+        with self._coalesce_lock:
+            slot = self._coalescing[key]
+            if slot[0] is None:
+                del self._coalescing[key]
+                return None
+            pending, slot[0] = slot[0], None
+            return pending
+
+    def coalesces(self, address):
+        """ Whether all handlers for an OSC address only care about the latest message """
+        handlers = tuple(self._dispatcher.handlers_for_address(address))
+        return bool(handlers) and all(
+            getattr(handler.callback, '_coalesce', False) for handler in handlers
+        )
+
+    def enable_stats(self, max_addresses = None):
+        """ Start recording per-address counts & timings, also available at /_stats
+
+                Sending /_stats to the app replies one /_stats/reply message per address:
+                    address, count, resolve p50, resolve p99, wait p50, wait p99,
+                    handler p50, handler p99, handler max (in seconds)
+        """
+        if self.stats is None:
+            self.stats = DispatchStats(max_addresses)
+            self._dispatcher.map_method('/_stats', OSCApp._reply_stats, self)
+
+    def disable_stats(self):
+        if self.stats is not None:
+            self.stats = None
+            self._dispatcher.unmap_method('/_stats', OSCApp._reply_stats, self)
+
+    def _reply_stats(self, client_address, *_):
+        server = getattr(self, 'server', None)
+        stats = self.stats
+        if server is None or stats is None:
+            return
+        for address, s in stats.snapshot().items():
+            server.send('/_stats/reply', [  # not /_stats: other apps would reply to the reply
+                address, s['count'],
+                s['resolve']['p50'], s['resolve']['p99'],
+                s['wait']['p50'], s['wait']['p99'],
+                s['handler']['p50'], s['handler']['p99'], s['handler']['max'],
+            ], *client_address)
+    _reply_stats._pass_address = True  # mapped by enable_stats(), not @handleOSC
+    _reply_stats._kwargs = {}
+
+    def enable_replication(self, interval = 0.05):
+        """ Replicate the __REPLICATED__ attributes of this app's containers to other
+            nodes & apply theirs, see ooposc.replication.Replicator
+
+                Late joiners get the current state: this asks the other nodes for a snapshot.
+        """
+        if self.replicator is None:
+            self.replicator = Replicator(self, interval)
+            self._dispatcher.map_method('/_replica/delta', Replicator._receive_delta, self.replicator)
+            self._dispatcher.map_method('/_replica/state', Replicator._receive_state, self.replicator)
+            self._dispatcher.map_method('/_replica/request', Replicator._receive_request, self.replicator)
+            self.replicator.request_snapshot()
+
+    def disable_replication(self):
+        if self.replicator is not None:
+            for address, method in (('/_replica/delta', Replicator._receive_delta),
+                                    ('/_replica/state', Replicator._receive_state),
+                                    ('/_replica/request', Replicator._receive_request)):
+                self._dispatcher.unmap_method(address, method, self.replicator)
+            self.replicator.close()
+            self.replicator = None
+
+    def priority(self, address):
+        """ Highest priority of the handlers for an OSC address (0 if not set) """
+        return max(
+            (getattr(handler.callback, '_priority', 0)
+             for handler in self._dispatcher.handlers_for_address(address)),
+            default = 0
+        )
+
+    def _count_coalesced(self, address):
+        with self._coalesce_lock:
+            self.coalesced[address] += 1
+
+    def _count_rejected(self, address):
+        with self._coalesce_lock:
+            self.rejected[address] += 1
+
+    def _run_coroutine(self, coroutine):
+        """ Run the coroutine returned by an `async def` handler
+
+                - in the event loop of the current thread, if any
+                - otherwise in the event loop of an asynchronous server
+                - otherwise, until completion
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = getattr(getattr(self, 'server', None), 'loop', None)
+            if loop is None or loop.is_closed():
+                asyncio.run(coroutine)
+            else:
+                asyncio.run_coroutine_threadsafe(coroutine, loop)
+            return
+
+        task = loop.create_task(coroutine)
+        self._tasks.add(task)  # keep a reference until done
+        task.add_done_callback(self._tasks.discard)
+
+    def connect(self, address, send_port, OSCServer = OSCInterface, **kwargs):
+        """ Connect to an OSC interface; kwargs are passed on to its constructor """
+        self.server = OSCServer(self, address, send_port, **kwargs)
 
     def handle(self):
         self.server.handle()
@@ -267,14 +639,25 @@ class ParallelApp:
     def await_event(self):
         self._app.handle()
         if self._do_listen:
-            self.await_event()
+            self.background(self.await_event)  # re-schedule instead of recursing
 
     def listen(self):
-        self.background(self.await_event)
+        if isinstance(self._app.server, AsyncMulticastOSC):
+            # datagrams are handled by the loop itself, no need to poll
+            asyncio.run_coroutine_threadsafe(
+                self._app.server.start(), self.__LOOP__
+            ).result()
+        else:
+            self.background(self.await_event)
 
     def quit(self):
         for instance in self.__INSTANCES__:
-            instance.__LOOP__.stop()
+            instance._do_listen = False
+            if isinstance(instance._app.server, AsyncMulticastOSC):
+                asyncio.run_coroutine_threadsafe(
+                    instance._app.server.close(), instance.__LOOP__
+                ).result()
+            instance.__LOOP__.call_soon_threadsafe(instance.__LOOP__.stop)
 
 
 class UDPMethodHandler(socketserver.BaseRequestHandler):
@@ -291,6 +674,30 @@ class UDPMethodHandler(socketserver.BaseRequestHandler):
 
 
 
+ReceiveStats = collections.namedtuple(
+    typename = 'ReceiveStats',
+    field_names = ('batches', 'datagrams', 'max_batch', 'rcvbuf', 'kernel_drops')
+)
+
+
+def udp_drops(sock):
+    """ Datagrams the kernel dropped for a UDP socket (e.g. because its receive buffer
+        was full), from /proc/net/udp; None where that isn't available (non-Linux)
+    """
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        for table in ('/proc/net/udp', '/proc/net/udp6'):
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[9] == inode:
+                        return int(fields[-1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
 class Multicast():
     __MULTICAST_GROUP__ = "239.0.0.1"
     __MULTICAST_PORT__ = 5001
@@ -302,10 +709,49 @@ class MulticastPythonOSC(ThreadingOSCUDPServer, Multicast, OSCInterface):
 
         * Implement receive & send on a single interface
         * Multicasting support
+        * Optionally, handle requests with a fixed pool of worker threads
+          instead of a new thread per datagram
+        * Optionally, receive into a pool of reusable buffers instead of
+          allocating a bytes object per datagram
+        * Optionally, drain all pending datagrams per wakeup & dispatch them as a batch
+        * Optionally, unicast through connected per-destination sockets
     """
 
-    def __init__(self, app: OSCApp, address = '', send_port = ''):
+    def __init__(self, app: OSCApp, address = '', send_port = '',
+                 workers = None, queue_size = 1024, overflow = 'block', ordered = False,
+                 priorities = False, shed_priority = None, shed_depth = None, max_age = None,
+                 buffers = None, batch = None, rcvbuf = None, send_sockets = None):
+        """
+        :param workers:         Number of worker threads; None spawns a thread per datagram
+        :param queue_size:      Maximum number of requests waiting for a worker (per worker if ordered)
+        :param overflow:        What to do when the queue is full:
+                                'block', 'drop-oldest' or 'drop-newest'
+        :param ordered:         Handle messages for the same OSC address on the same worker,
+                                in arrival order
+        :param priorities:      Serve messages for handlers with a higher @handleOSC(priority = ...)
+                                first (handlers without one have priority 0)
+        :param shed_priority:   Shed messages of at most this priority (default 0) when...
+        :param shed_depth:      ...this many requests are waiting, or
+        :param max_age:         ...they have been waiting for longer than this (seconds)
+        :param buffers:         Number of pooled receive buffers; None receives into a new
+                                bytes object per datagram
+        :param batch:           Maximum number of datagrams handle() reads per wakeup;
+                                None handles a single datagram per call
+        :param rcvbuf:          Socket receive buffer size (SO_RCVBUF) in bytes; the kernel
+                                may adjust it, see receive_stats()
+        :param send_sockets:    Number of connected sockets to keep for unicast, one per
+                                destination (see SendSockets); None unicasts from the
+                                server socket, i.e. from the multicast port
+        """
         self.allow_reuse_address = True
+        if workers:
+            self.pool = WorkerPool(
+                workers, queue_size, overflow, ordered,
+                priorities, shed_priority, shed_depth, max_age,
+                discard = self.discard_request_pooled
+            )
+        else:
+            self.pool = None
 
         ThreadingOSCUDPServer.__init__(
             self, (address, self.__MULTICAST_PORT__), app._dispatcher
@@ -313,40 +759,532 @@ class MulticastPythonOSC(ThreadingOSCUDPServer, Multicast, OSCInterface):
         self.RequestHandlerClass = UDPMethodHandler
         self._app = app
 
+        if buffers:
+            self.buffers = BufferPool(self.max_packet_size, buffers)
+        else:
+            self.buffers = None
+
         # Set up server for Multicasting
         mreq = struct.pack(
             "4sl", socket.inet_aton(self.__MULTICAST_GROUP__), socket.INADDR_ANY
         )
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        if rcvbuf:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
 
+        self.batch = batch
+        self.batches = 0
+        self.datagrams = 0
+        self.max_batch = 0
 
-        # Set up client for Multicasting
-        # self.send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        # self.send_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        # self.send_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
-        # self.send_socket.bind((address, send_port))
+
+        # Set up client for unicasting; multicast is sent from the server socket
+        if send_sockets:
+            self.send_sockets = SendSockets(send_sockets)
+        else:
+            self.send_sockets = None
 
         self._address = self.server_address # todo: this is dumb support for mutual inheritance from VirtualSocket...
 
+        self.bundler = None  # see start_bundling()
+        self._bundling = threading.local()  # see bundle()
+        self.capture = None  # see start_capture()
+
     @staticmethod
     def build_osc(osc_address, values):
-        """ Copied from pythonosc.udp_client """
-        builder = OscMessageBuilder(address = osc_address)
-        if not isinstance(values, Iterable) or isinstance(values, (str, bytes)):
+        """ Adapted from pythonosc.udp_client; see ooposc.encoding for the fast path """
+        if not isinstance(values, Iterable) or isinstance(values, (str, bytes)) \
+                or is_array(values):  # a single array is a single blob
             values = [values]
-        for val in values:
-            builder.add_arg(val)
-        content = builder.build()
-        return content.dgram
+        elif not isinstance(values, (list, tuple)):
+            values = list(values)
+        return build_message(osc_address, values)
 
     def finish_request(self, request, client_address):
         """ Override finish_request() to allow class method dispatching """
         self.RequestHandlerClass(request, client_address, self, self._app)
 
-    # def get_request(self):
-    #     """ Keep client address as (address, port) tuple """
-    #     data, client_addr = self.socket.recvfrom(self.max_packet_size)
+    def process_request(self, request, client_address):
+        """ Hand the request to the worker pool, if there is one """
+        if self.pool is None:
+            ThreadingOSCUDPServer.process_request(self, request, client_address)
+            return
+
+        data = request[0]
+        address = osc_address_of(data).decode('utf-8', 'replace')
+        # messages that only coalescing handlers care about replace each other in the queue
+        coalesce = not is_bundle(data) and self._app.coalesces(address)
+        priority = self._app.priority(address) if self.pool.priorities else 0
+
+        if self._app.stats is not None:
+            timing = (address, time.perf_counter())
+        else:
+            timing = ()
+
+        outcome = self.pool.submit(
+            data, self.process_request_pooled, request, client_address, *timing,
+            coalesce = address if coalesce else None, priority = priority
+        )
+        if outcome == COALESCED:
+            self._app._count_coalesced(address)
+
+    def process_request_pooled(self, request, client_address, address = None, queued = None):
+        if address is not None and self._app.stats is not None:
+            self._app.stats.record_wait(address, time.perf_counter() - queued)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def discard_request_pooled(self, request, client_address, *_):
+        """ A queued request was dropped, coalesced or shed: return its buffer """
+        self.shutdown_request(request)
+
+    def server_close(self):
+        ThreadingOSCUDPServer.server_close(self)
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.send_sockets is not None:
+            self.send_sockets.close()
+        self.stop_capture()
+
+    def get_request(self):
+        received = self._receive_captured()
+        if received is None:  # handle_request() skips requests that raise OSError
+            raise OSError('Datagram is not for this server')
+        return received
+
+    def _receive_captured(self, flags = 0):
+        """ _receive(), recording the request if capturing """
+        received = self._receive(flags)
+        capture = self.capture
+        if received is not None and capture is not None:
+            (data, _), client_address = received
+            capture.record(data, client_address)
+        return received
+
+    def _receive(self, flags = 0):
+        """ Receive a request, into a pooled buffer if there are buffers
+
+                With buffers, the request's data is a memoryview of the buffer.
+                Returns None for datagrams that should be skipped.
+        """
+        if self.buffers is None:
+            data, client_address = self.socket.recvfrom(self.max_packet_size, flags)
+            return (data, self.socket), client_address
+        buffer = self.buffers.acquire()
+        try:
+            size, client_address = self.socket.recvfrom_into(buffer, 0, flags)
+        except OSError:
+            self.buffers.release(buffer)
+            raise
+        return (memoryview(buffer)[:size], self.socket), client_address
+
+    def handle_batch(self, timeout = None):
+        """ Wait for a datagram, then read up to batch pending ones & dispatch them
+
+                Without a worker pool, the batch is handled in order on a single
+                thread instead of a thread per datagram. Returns the batch size.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        ready, _, _ = select.select([self.socket], [], [], timeout)
+        if not ready:
+            self.handle_timeout()
+            return 0
+
+        requests = []
+        while len(requests) < (self.batch or 1):
+            try:
+                received = self._receive_captured(socket.MSG_DONTWAIT)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                if requests:
+                    break
+                return 0
+            if received is None:  # not for us
+                continue
+            request, client_address = received
+            if self.verify_request(request, client_address):
+                requests.append(received)
+            else:
+                self.shutdown_request(request)
+
+        self.batches += 1
+        self.datagrams += len(requests)
+        self.max_batch = max(self.max_batch, len(requests))
+
+        if requests:
+            self.process_batch(requests)
+        return len(requests)
+
+    def process_batch(self, requests):
+        """ Dispatch a batch of (request, client_address) """
+        if self.pool is not None:
+            for request, client_address in requests:
+                self.process_request(request, client_address)
+            return
+        if self.block_on_close:
+            vars(self).setdefault('_threads', socketserver._Threads())
+        thread = threading.Thread(
+            target = self._process_batch, args = (requests,),
+            daemon = self.daemon_threads
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _process_batch(self, requests):
+        for request, client_address in requests:
+            self.process_request_pooled(request, client_address)
+
+    def receive_stats(self):
+        """ Batching counters, the actual SO_RCVBUF & the kernel's drop count for the socket """
+        return ReceiveStats(
+            self.batches, self.datagrams, self.max_batch,
+            self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+            udp_drops(self.socket)
+        )
+
+    def verify_request(self, request, client_address):
+        """ Same check as python-osc's, for memoryviews as well as bytes """
+        data = request[0]
+        return is_bundle(data) or data[:1] == b'/'
+
+    def shutdown_request(self, request):
+        """ Return the request's buffer to the pool once it has been handled """
+        ThreadingOSCUDPServer.shutdown_request(self, request)
+        data = request[0]
+        if self.buffers is not None and isinstance(data, memoryview):
+            buffer = data.obj
+            data.release()
+            self.buffers.release(buffer)
+
+    def send(self, osc_address, values = None, address = None, port = None):
+        bundler = getattr(self._bundling, 'bundler', None) or self.bundler
+        if bundler is not None:
+            bundler.add(
+                MulticastPythonOSC.build_osc(osc_address, [] if values is None else values),
+                address, port
+            )
+            return
+
+        self._send_datagram(
+            MulticastPythonOSC.build_osc(osc_address, [] if values is None else values),
+            address, port
+        )
+
+    @contextlib.contextmanager
+    def bundle(self, timestamp = None, mtu = None):
+        """ Bundle everything sent from this thread within the context
+
+                with server.bundle():
+                    server.send('/a', 1)
+                    server.send('/b', 2)
+
+            :param timestamp:   time.time() at which receivers should handle the
+                                messages; None for immediately
+            :param mtu:         maximum datagram size
+        """
+        previous = getattr(self._bundling, 'bundler', None)
+        self._bundling.bundler = Bundler(self._send_datagram, mtu, timestamp = timestamp)
+        try:
+            yield self._bundling.bundler
+        finally:
+            self._bundling.bundler.close()
+            self._bundling.bundler = previous
+
+    def start_bundling(self, interval = 0.005, mtu = None):
+        """ Bundle everything sent from any thread, sending bundles every interval seconds
+            or as soon as they're full
+        """
+        self.stop_bundling()
+        self.bundler = Bundler(self._send_datagram, mtu, interval)
+
+    def stop_bundling(self):
+        if self.bundler is not None:
+            bundler, self.bundler = self.bundler, None
+            bundler.close()
+
+    def start_capture(self, path):
+        """ Append every datagram received from now on to a capture file, see ooposc.capture """
+        self.stop_capture()
+        self.capture = Capture(path)
+
+    def stop_capture(self):
+        if self.capture is not None:
+            capture, self.capture = self.capture, None
+            capture.close()
+
+    def _send_datagram(self, datagram, address = None, port = None):
+        """ Send a raw OSC datagram (bytes, or a list of buffers making up one datagram) """
+        datagram = buffers(datagram)
+        if address is None and port is None:
+            self.multicast(self._frame(datagram))
+        else:
+            self.unicast(self._frame(datagram, (address, port)), address, port)
+
+    def _frame(self, datagram, to_address = None):
+        """ Wrap a raw OSC datagram (a list of buffers) as it should go over the socket,
+            to to_address or to all
+        """
+        return datagram
+
+    def multicast(self, message):
+        """ Multicast a datagram: bytes, or a list of buffers (sent without joining them) """
+        self.socket.sendmsg(
+            buffers(message), (), 0, (self.__MULTICAST_GROUP__, self.__MULTICAST_PORT__)
+        )
+
+    def unicast(self, message, address, port):
+        """ Unicast a datagram: bytes, or a list of buffers (sent without joining them) """
+        if self.send_sockets is not None:
+            self.send_sockets.send(message, address, port)
+        else:
+            self.socket.sendmsg(buffers(message), (), 0, (address, port))
+
+    def handle(self):
+        if self.batch:
+            self.handle_batch()
+        else:
+            ThreadingOSCUDPServer.handle_request(self)
+
+
+class ShardedMulticastPythonOSC(MulticastPythonOSC):
+
+    """
+    MulticastPythonOSC that handles requests in worker processes, each running a
+    replica of the OSCApp, so that handlers aren't limited to one core by the GIL
+
+        Routing policy: a datagram is handled by process shard_of(datagram, processes),
+        i.e. crc32 of its OSC address modulo the number of processes (the same policy
+        as WorkerPool(ordered = True)):
+            * all messages for an OSC address are handled by the same process,
+              one at a time, in arrival order
+            * a bundle is never split up; it goes where the address of its first
+              message goes
+            * addresses are hashed literally: the pattern '/a/*' and the address
+              '/a/1' may be handled by different processes
+
+        The replicas are forked from the app as it is when the server is created and
+        don't share state with each other or with the parent; state that belongs to
+        an address lives in the process that address is routed to. Replies are sent
+        through the server's socket. Requires the 'fork' start method (Unix).
+
+        The parent receives & routes; SO_REUSEPORT sockets aren't used because the
+        kernel balances those by sender, not by OSC address. Each process has a
+        bounded queue in the parent, fed to it by a thread of its own, so that a slow
+        process only holds up its own datagrams; queues apply the overflow policy
+        (their counters are in self.queues).
+    """
+
+    def __init__(self, app: OSCApp, address = '', send_port = '', processes = 4,
+                 queue_size = 1024, overflow = 'block', close_timeout = 5.0, **kwargs):
+        """
+        :param processes:       Number of worker processes
+        :param queue_size:      Maximum number of datagrams waiting for each process
+        :param overflow:        What to do when a process' queue is full:
+                                'block', 'drop-oldest' or 'drop-newest'
+        :param close_timeout:   Seconds server_close() waits for the processes to handle
+                                what was routed to them, before terminating them
+        :param kwargs:          See MulticastPythonOSC
+        """
+        MulticastPythonOSC.__init__(
+            self, app, address, send_port, queue_size = queue_size, overflow = overflow, **kwargs
+        )
+        app.server = self  # before forking, so that the replicas can send
+        self.close_timeout = close_timeout
+
+        context = multiprocessing.get_context('fork')
+        self._shards = []
+        self._processes = []
+        for i in range(processes):
+            reader, writer = context.Pipe(duplex = False)
+            process = context.Process(
+                target = self._serve_shard, args = (reader,),
+                name = f"OSCShard-{i}", daemon = True
+            )
+            process.start()
+            reader.close()
+            self._shards.append(writer)
+            self._processes.append(process)
+
+        # threads only after forking
+        self.queues = [BoundedQueue(queue_size, overflow) for _ in self._shards]
+        self._forwarders = []
+        for i, (queue, writer) in enumerate(zip(self.queues, self._shards)):
+            thread = threading.Thread(
+                target = self._forward, args = (queue, writer),
+                name = f"OSCShardForwarder-{i}", daemon = True
+            )
+            thread.start()
+            self._forwarders.append(thread)
+
+    def process_request(self, request, client_address):
+        """ Queue the request for the process its OSC address is routed to """
+        data = request[0]
+        try:
+            self.queues[shard_of(data, len(self.queues))].put((bytes(data), client_address))
+        finally:
+            self.shutdown_request(request)
+
+    @staticmethod
+    def _forward(queue, writer):
+        """ Send the datagrams queued for a process down its pipe, then tell it to stop """
+        try:
+            while True:
+                item = queue.get()
+                if item is None:
+                    break
+                writer.send(item)
+            writer.send(None)
+        except OSError:  # the process is gone
+            pass
+        finally:
+            writer.close()
+
+    def process_batch(self, requests):
+        for request, client_address in requests:
+            self.process_request(request, client_address)
+
+    def _serve_shard(self, reader):
+        """ Handle the datagrams routed to this process (runs in the worker process) """
+        while True:
+            try:
+                item = reader.recv()
+            except EOFError:
+                return
+            if item is None:
+                return
+            data, client_address = item
+            try:
+                self._app._call_handlers_for_packet(data, client_address)
+            except Exception:
+                logging.exception('OSC shard raised an exception')
+
+    def server_close(self):
+        """ Stop the worker processes once they've handled what was routed to them,
+            terminating those that don't within close_timeout
+        """
+        for queue in self.queues:
+            queue.close()
+        deadline = time.monotonic() + self.close_timeout
+        for thread in self._forwarders:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logging.warning(f"{process.name} didn't stop in time, terminating it")
+                process.terminate()
+                process.join()
+        MulticastPythonOSC.server_close(self)
+
+
+class OSCDatagramProtocol(asyncio.DatagramProtocol):
+    """ Feed received datagrams to an OSCApp from within an asyncio event loop """
+    def __init__(self, app: OSCApp):
+        self._app = app
+        self._waiters = []
+
+    def datagram_received(self, data, client_address):
+        self._app._call_handlers_for_packet(data, client_address)
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    def error_received(self, exc):
+        logging.warning(f"OSC datagram endpoint error: {exc}")
+
+    def next_datagram(self):
+        """ Return a future that is resolved after the next datagram has been handled """
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        return waiter
+
+
+class AsyncMulticastOSC(Multicast, OSCInterface):
+
+    """
+    asyncio implementation of MulticastPythonOSC
+
+        * Datagrams are handled within the event loop, without polling or threads
+        * Handlers may be coroutines (`async def`), these are run as tasks
+        * Any number of OSCApp instances can share a single event loop:
+
+            app1.connect('', 0, AsyncMulticastOSC)
+            app2.connect('', 0, AsyncMulticastOSC)
+            await app1.server.start()
+            await app2.server.start()
+            ...
+            await app1.server.close()
+    """
+
+    def __init__(self, app: OSCApp, address = '', send_port = ''):
+        self._app = app
+        self._bind_address = address
+        self.loop = None
+        self.transport = None
+        self.protocol = None
+        self._address = None
+
+    @property
+    def address(self):
+        return self._address
+
+    def _socket(self):
+        """ Multicast-enabled UDP socket, bound to the multicast port """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self._bind_address, self.__MULTICAST_PORT__))
+
+        mreq = struct.pack(
+            "4sl", socket.inet_aton(self.__MULTICAST_GROUP__), socket.INADDR_ANY
+        )
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        sock.setblocking(False)
+        return sock
+
+    async def start(self):
+        """ Create the datagram endpoint in the running event loop """
+        if self.transport is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await self.loop.create_datagram_endpoint(
+            lambda: OSCDatagramProtocol(self._app), sock = self._socket()
+        )
+        self._address = self.transport.get_extra_info('sockname')
+
+    async def close(self):
+        """ Stop receiving and cancel handler coroutines that are still running """
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        tasks = [task for task in self._app._tasks if task.get_loop() is self.loop]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+
+    def handle(self):
+        """ Run a private event loop until a datagram has been handled (blocking) """
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        if self.loop.is_running():
+            raise RuntimeError(
+                'AsyncMulticastOSC.handle() blocks, use `await start()` in a running event loop'
+            )
+        self.loop.run_until_complete(self._handle())
+
+    async def _handle(self):
+        await self.start()
+        await self.protocol.next_datagram()
+
+    @staticmethod
+    def build_osc(osc_address, values):
+        return MulticastPythonOSC.build_osc(osc_address, values)
 
     def send(self, osc_address, values = None, address = None, port = None):
         if values is None:
@@ -360,15 +1298,26 @@ class MulticastPythonOSC(ThreadingOSCUDPServer, Multicast, OSCInterface):
             self.unicast(message, address, port)
 
     def multicast(self, message: bytes):
-        self.socket.sendto(
-            message, (self.__MULTICAST_GROUP__, self.__MULTICAST_PORT__)
-        )
+        self._sendto(message, (self.__MULTICAST_GROUP__, self.__MULTICAST_PORT__))
 
     def unicast(self, message, address, port):
-        self.socket.sendto(message, (address, port))
+        self._sendto(message, (address, port))
 
-    def handle(self):
-        ThreadingOSCUDPServer.handle_request(self)
+    def _sendto(self, message, address):
+        transport = self.transport
+        if transport is None:
+            raise RuntimeError(
+                "AsyncMulticastOSC isn't started, use `await start()` before sending"
+            )
+        try:
+            in_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            in_loop = False
+
+        if in_loop:
+            transport.sendto(message, address)
+        else:  # transports aren't thread-safe
+            self.loop.call_soon_threadsafe(transport.sendto, message, address)
 
 
 class VirtualMulticastPythonOSC(VirtualSocket, MulticastPythonOSC):
@@ -376,36 +1325,310 @@ class VirtualMulticastPythonOSC(VirtualSocket, MulticastPythonOSC):
     """
     Simulate a random IP address to allow sending & of multicast messages on a single system
 
-        VirtualSocket encodes / decodes each message into:
-            message = {sender address = *address*, message = *actual message*}
+        VirtualSocket wraps each message in a binary envelope:
+            header (version, sender address, optional destination) + OSC datagram
 
-            todo: also unicast
+        Virtual addresses can't be reached directly: unicast to one is multicast
+        with the destination in the envelope, and only that socket handles it.
     """
 
-    def __init__(self, app: OSCApp, recv_address, send_port):
+    def __init__(self, app: OSCApp, recv_address, send_port, **kwargs):
         VirtualSocket.__init__(self)
-        MulticastPythonOSC.__init__(self, app, recv_address, send_port)
+        MulticastPythonOSC.__init__(self, app, recv_address, send_port, **kwargs)
 
-    def get_request(self):
-        """ Intercept & decode request, pass along """
-        data, sender_address = self.socket.recvfrom(self.max_packet_size)
+    def _receive(self, flags = 0):
+        """ Intercept & decode request, pass along
 
-        if sender_address != self.real_address:
-            return (data, self.socket), sender_address
-        else:
-            data, sender_address = self.decode(data)
-            data = bytes(data.encode('utf-8')) # deal with JSON bytes() shenanigans
-            if sender_address != self.address:
-                return (data, self.socket), sender_address
-            else:
-                pass
+                The OSC datagram is passed on as a memoryview of the received data.
+        """
+        request, sender_address = MulticastPythonOSC._receive(self, flags)
+
+        if not is_envelope(request[0]):  # plain OSC from a real socket
+            return request, sender_address
+
+        decoded = self.decode(request[0])
+        if decoded is None or decoded[1] == self.address:  # not for us, or our own
+            self.shutdown_request(request)
+            return None
+        data, sender_address = decoded
+        return (data, self.socket), sender_address
 
     def build_osc(self, osc_address, values):
         message = MulticastPythonOSC.build_osc(osc_address, values)
         return self.encode(message)
 
+    def _frame(self, datagram, to_address = None):
+        if to_address is not None and not is_virtual(to_address):
+            to_address = None  # a real socket, see unicast()
+        return [self.envelope(to_address)] + datagram
+
+    def unicast(self, message, address, port):
+        if is_virtual((address, port)):
+            self.multicast(message)
+        else:
+            MulticastPythonOSC.unicast(self, message, address, port)
+
     # def handle(self):
     #     try:
     #         ThreadingOSCUDPServer.handle_request(self)
     #     except TypeError:
     #         pass # todo: why is this here?
+
+
+class LoopbackOSC(VirtualSocket, OSCInterface):
+
+    """
+    Connect OSCApps through a LoopbackBus (shared memory) instead of sockets
+
+        * Multicast & unicast like VirtualMulticastPythonOSC, between apps in one
+          process or in local processes sharing the bus:
+
+            bus = LoopbackBus()
+            app1.connect('', 0, LoopbackOSC, bus = bus)
+            app2.connect('', 0, LoopbackOSC, bus = bus)
+            app1.server.send('/level', 0.5)                        # to all others
+            app1.server.send('/level', 0.5, *app2.server.address)  # to app2
+
+        * Senders are identified by their virtual address, see VirtualSocket
+        * Sending blocks while a receiver's ring is full (see LoopbackBus.overflow)
+    """
+
+    def __init__(self, app: OSCApp, address = '', send_port = '', bus: LoopbackBus = None,
+                 timeout = None):
+        """
+        :param bus:         LoopbackBus to attach to
+        :param timeout:     Maximum time handle() waits for a datagram, and send()
+                            waits for room in a receiver's ring (seconds)
+        """
+        if bus is None:
+            raise ValueError('LoopbackOSC needs a LoopbackBus to attach to')
+        VirtualSocket.__init__(self)
+        self._app = app
+        self.bus = bus
+        self.timeout = timeout
+
+        self._slot = None
+        while self._slot is None:  # virtual addresses are only unique per process
+            self._slot = bus.attach(pack_address(self.address))
+            if self._slot is None:
+                self.set_address()
+
+    def handle(self):
+        """ Handle the next datagram on the bus (blocking, up to timeout) """
+        self.bus.receive(self._slot, self._handle_datagram, self.timeout)
+
+    def _handle_datagram(self, datagram, host, port):
+        self._app._call_handlers_for_packet(datagram, unpack_address(host, port))
+
+    build_osc = staticmethod(MulticastPythonOSC.build_osc)
+
+    def send(self, osc_address, values = None, address = None, port = None):
+        message = self.build_osc(osc_address, [] if values is None else values)
+        if address is None and port is None:
+            self.multicast(message)
+        else:
+            self.unicast(message, address, port)
+
+    def multicast(self, message: bytes):
+        self.bus.publish(self._slot, message, None, self.timeout)
+
+    def unicast(self, message, address, port):
+        slot = self.bus.find(pack_address((address, port)))
+        if slot is not None:  # like UDP, sending to nobody isn't an error
+            self.bus.publish(self._slot, message, slot, self.timeout)
+
+    def close(self):
+        """ Detach from the bus """
+        if self._slot is not None:
+            self.bus.detach(self._slot)
+            self._slot = None
+
+
+class StreamOSC(OSCInterface):
+
+    """
+    OSC over TCP, for packets too large for UDP & messages that mustn't get lost
+
+        * OSC 1.1 SLIP framing, or framing = 'length' for OSC 1.0 size prefixes
+        * The listening socket & all connections are served by one selector, in
+          handle(): received packets are handled on that thread, as they are parsed
+        * Connections are persistent & pooled per peer: unicast replies through the
+          connection a peer connected from, or connects to the peer (blocking);
+          the least recently used connection is closed when the pool is full
+        * Streams have no multicast; multicast() sends to all connected peers
+
+            app1.connect('', 0, StreamOSC)
+            app2.connect('', 0, StreamOSC, port = 0)
+            app2.server.send('/preset', [dump], *app1.server.address)
+    """
+
+    __PORT__ = 5001
+    __BUFFER_SIZE__ = 65536
+
+    def __init__(self, app: OSCApp, address = '', send_port = '', port = None,
+                 framing = 'slip', connections = 64, timeout = None, max_packet_size = None):
+        """
+        :param port:                TCP port to listen on (default __PORT__, 0 for any)
+        :param framing:             'slip' or 'length'
+        :param connections:         Maximum number of open connections
+        :param timeout:             Maximum time handle() waits, and connecting waits (seconds)
+        :param max_packet_size:     Close connections sending larger packets
+                                    (default ooposc.stream.__MAX_PACKET_SIZE__)
+        """
+        if framing not in FRAMINGS:
+            raise ValueError(f"framing should be one of {tuple(FRAMINGS)}, not '{framing}'")
+        self._app = app
+        self._encode, self._decoder = FRAMINGS[framing]
+        self._decoder_kwargs = {} if max_packet_size is None else {'max_packet_size': max_packet_size}
+        self.size = connections
+        self.timeout = timeout
+
+        self._listener = socket.create_server((address, self.__PORT__ if port is None else port))
+        self._listener.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ, None)
+        self._buffer = bytearray(self.__BUFFER_SIZE__)
+
+        self._connections = collections.OrderedDict()  # peer: StreamConnection, least recently used first
+        self._lock = threading.Lock()  # _connections & _selector
+        self.opened = 0
+        self.evicted = 0
+
+    @property
+    def address(self):
+        return self._listener.getsockname()[:2]
+
+    def handle(self):
+        """ Wait for stream activity (up to timeout) & handle it: new connections,
+            received packets and output that couldn't be sent right away
+        """
+        for key, events in self._selector.select(self.timeout):
+            connection = key.data
+            if connection is None:
+                self._accept()
+                continue
+            try:
+                if events & selectors.EVENT_READ:
+                    self._read(connection)
+                if events & selectors.EVENT_WRITE:
+                    self._flush(connection)
+            except (OSError, ValueError) as e:  # ValueError: invalid framing
+                logging.debug(f"Closing OSC stream from {connection.peer}: {e}")
+                self._close(connection)
+
+    def _accept(self):
+        try:
+            sock, peer = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        self._add(self._connection(sock, peer[:2]))
+
+    def _connection(self, sock, peer):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.opened += 1
+        return StreamConnection(sock, peer, self._decoder(**self._decoder_kwargs))
+
+    def _read(self, connection):
+        size = connection.sock.recv_into(self._buffer)
+        if not size:
+            self._close(connection)
+            return
+        for packet in connection.decoder.feed(self._buffer, size):
+            try:
+                self._app._call_handlers_for_packet(packet, connection.peer)
+            except Exception:
+                logging.exception('OSC stream handler raised an exception')
+
+    def _flush(self, connection):
+        with connection.lock:
+            if not connection.flush():
+                self._watch(connection, selectors.EVENT_READ)
+
+    def _watch(self, connection, events):
+        with self._lock:
+            if self._connections.get(connection.peer) is connection:
+                self._selector.modify(connection.sock, events, connection)
+
+    def _add(self, connection):
+        """ Pool a connection, unless there is one for its peer already; returns the pooled one """
+        with self._lock:
+            pooled = self._connections.get(connection.peer)
+            if pooled is not None:
+                connection.close()
+                return pooled
+            while len(self._connections) >= self.size:
+                _, evicted = self._connections.popitem(last = False)
+                self._selector.unregister(evicted.sock)
+                evicted.close()
+                self.evicted += 1
+            self._connections[connection.peer] = connection
+            self._selector.register(connection.sock, selectors.EVENT_READ, connection)
+            return connection
+
+    def _close(self, connection):
+        with self._lock:
+            if self._connections.get(connection.peer) is connection:
+                del self._connections[connection.peer]
+                self._selector.unregister(connection.sock)
+        connection.close()
+
+    def _pooled(self, peer):
+        with self._lock:
+            connection = self._connections.get(peer)
+            if connection is not None:
+                self._connections.move_to_end(peer)
+            return connection
+
+    def _write(self, connection, data):
+        with connection.lock:
+            if connection.write(data):
+                self._watch(connection, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    build_osc = staticmethod(MulticastPythonOSC.build_osc)
+
+    def send(self, osc_address, values = None, address = None, port = None):
+        message = self.build_osc(osc_address, [] if values is None else values)
+        if address is None and port is None:
+            self.multicast(message)
+        else:
+            self.unicast(message, address, port)
+
+    def multicast(self, message: bytes):
+        """ Send to all connected peers """
+        data = self._encode(message)
+        with self._lock:
+            connections = list(self._connections.values())
+        for connection in connections:
+            try:
+                self._write(connection, data)
+            except OSError:
+                self._close(connection)
+
+    def unicast(self, message, address, port):
+        """ Send through the peer's connection; reconnects once if it was closed """
+        data = self._encode(message)
+        peer = (address, port)
+        connection = self._pooled(peer)
+        if connection is not None:
+            try:
+                self._write(connection, data)
+                return
+            except OSError:
+                self._close(connection)
+        sock = socket.create_connection(peer, self.timeout)  # outside the lock: this blocks
+        connection = self._add(self._connection(sock, peer))
+        try:
+            self._write(connection, data)
+        except OSError:
+            self._close(connection)
+            raise
+
+    def close(self):
+        """ Close all connections & stop listening """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+        self._selector.close()
+        self._listener.close()
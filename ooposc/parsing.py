@@ -0,0 +1,253 @@
+import re
+import struct
+import collections
+import datetime
+import logging
+import time
+
+from pythonosc.osc_packet import ParseError
+
+
+TimedMessage = collections.namedtuple(
+    typename = 'TimedMessage',
+    field_names = ('time', 'message')
+)
+
+__BUNDLE_PREFIX__ = b'#bundle\x00'
+__NTP_OFFSET__ = 2208988800  # seconds from 1900-01-01 (NTP) to 1970-01-01 (UNIX)
+__NTP_EPOCH__ = datetime.datetime(1900, 1, 1)
+__IMMEDIATELY__ = 1
+
+_null = re.compile(b'\x00')  # re works on any buffer, unlike .find() on a memoryview
+
+_int = struct.Struct('>i')
+_uint = struct.Struct('>I')
+_int64 = struct.Struct('>q')
+_uint64 = struct.Struct('>Q')
+_float = struct.Struct('>f')
+_double = struct.Struct('>d')
+
+
+class ParsedMessage:
+    """ OSC message parsed from a buffer; iterates over its arguments like pythonosc's OscMessage """
+    __slots__ = ('address', 'params', 'typetags')
+
+    def __init__(self, address, params, typetags = ''):
+        self.address = address
+        self.params = params
+        self.typetags = typetags  # e.g. ',ffi', '' if the message has no type tag string
+
+    def __iter__(self):
+        return iter(self.params)
+
+    def __len__(self):
+        return len(self.params)
+
+    def __repr__(self):
+        return f"ParsedMessage({self.address!r}, {self.params!r})"
+
+
+def is_bundle(data):
+    """ Whether a datagram (bytes, bytearray or memoryview) is an OSC bundle """
+    return data[:8] == __BUNDLE_PREFIX__
+
+
+def osc_address_of(data):
+    """ Return the (first) OSC address of a datagram without parsing it, as bytes
+
+            For bundles, this is the address of the first message in the bundle.
+            data may be bytes, a bytearray or a memoryview.
+    """
+    data = memoryview(data)
+    while is_bundle(data):
+        data = data[20:]  # '#bundle\0', timetag (8), size of the first element (4)
+    end = _null.search(data)
+    return bytes(data[:end.start() if end is not None else len(data)])
+
+
+def message_address(view):
+    """ Return (address, index of the type tags) of a single OSC message, without parsing
+        its arguments, or (None, 0) if it isn't one
+    """
+    end = _null.search(view)
+    if end is None or view[:1] != b'/':
+        return None, 0
+    try:
+        address = str(view[:end.start()], 'utf-8')
+    except UnicodeDecodeError:
+        return None, 0
+    return address, (end.start() & ~3) + 4
+
+
+class Signature:
+    """ Arguments declared with @handleOSC(types = ...), precompiled
+
+            The padded type tag string messages should have & a Struct decoding their
+            arguments in one go. Only fixed-size types are supported: i, f, d, h & r.
+    """
+    __slots__ = ('types', 'typetags', 'arguments', '_tags')
+
+    __STRUCT_CODES__ = {'i': 'i', 'f': 'f', 'd': 'd', 'h': 'q', 'r': 'I'}
+
+    def __init__(self, types):
+        unsupported = set(types) - set(self.__STRUCT_CODES__)
+        if unsupported:
+            raise ValueError(
+                f"Unsupported OSC types {''.join(sorted(unsupported))!r}; "
+                f"declared types should be any of {''.join(self.__STRUCT_CODES__)!r}"
+            )
+        self.types = types
+        self._tags = ',' + types
+        typetags = self._tags.encode('ascii')
+        self.typetags = typetags + b'\x00' * (4 - len(typetags) % 4)
+        self.arguments = struct.Struct('>' + ''.join(self.__STRUCT_CODES__[t] for t in types))
+
+    def unpack(self, view, index):
+        """ Arguments of the message whose type tags start at view[index],
+            or None if the message doesn't have exactly these types
+        """
+        end = index + len(self.typetags)
+        if len(view) != end + self.arguments.size or view[index:end] != self.typetags:
+            return None
+        return self.arguments.unpack_from(view, end)
+
+    def matches(self, message):
+        """ Whether a ParsedMessage has exactly these types, like unpack() """
+        return message.typetags == self._tags
+
+    def __repr__(self):
+        return f"Signature({self.types!r})"
+
+
+def parse_packet(data, now = None):
+    """ Parse a datagram into TimedMessages, sorted by time, like pythonosc's OscPacket
+
+            data may be any buffer, e.g. a memoryview of a pooled bytearray; it is read
+            in place with struct.unpack_from. Strings are decoded and blobs copied, so
+            nothing returned refers to the buffer.
+
+            Single messages & messages of bundles that are due immediately get time now;
+            other bundle messages keep their timetag, also when it's in the past.
+    """
+    if now is None:
+        now = time.time()
+    view = memoryview(data)
+    try:
+        if is_bundle(view):
+            messages = []
+            _parse_bundle(view, 0, len(view), now, messages)
+            messages.sort(key = lambda timed_message: timed_message.time)
+            return messages
+        else:
+            return [TimedMessage(now, parse_message(view, 0, len(view)))]
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ParseError(f"Could not parse datagram: {e}")
+
+
+def _parse_bundle(view, start, end, now, messages):
+    timetag, = _uint64.unpack_from(view, start + 8)
+    if timetag == __IMMEDIATELY__:
+        timestamp = now
+    else:
+        timestamp = timetag / (1 << 32) - __NTP_OFFSET__
+
+    index = start + 16
+    while index < end:
+        size, = _int.unpack_from(view, index)
+        index += 4
+        if size < 0 or index + size > end:
+            raise ParseError('Bundle element exceeds the datagram')
+        if view[index:index + 8] == __BUNDLE_PREFIX__:
+            _parse_bundle(view, index, index + size, now, messages)
+        elif view[index:index + 1] == b'/':
+            messages.append(TimedMessage(timestamp, parse_message(view, index, index + size)))
+        else:
+            logging.warning(f"Could not identify content type of {bytes(view[index:index + size])}")
+        index += size
+
+
+def _get_string(view, index, end):
+    match = _null.search(view, index, end)
+    if match is None:
+        raise ParseError('Unterminated OSC string')
+    stop = match.start()
+    return str(view[index:stop], 'utf-8'), (stop & ~3) + 4
+
+
+def parse_message(view, start, end):
+    """ Parse the OSC message in view[start:end] """
+    address, index = _get_string(view, start, end)
+    if not address.startswith('/'):
+        raise ParseError(f"OSC address should start with '/', got {address!r}")
+    params = []
+    if index >= end:
+        return ParsedMessage(address, params)
+
+    typetags, index = _get_string(view, index, end)
+    if not typetags.startswith(','):
+        raise ParseError(f"OSC type tags should start with ',', got {typetags!r}")
+
+    stack = [params]
+    for tag in typetags[1:]:
+        if tag == 'f':
+            value, = _float.unpack_from(view, index)
+            index += 4
+        elif tag == 'i':
+            value, = _int.unpack_from(view, index)
+            index += 4
+        elif tag == 's':
+            value, index = _get_string(view, index, end)
+        elif tag == 'T':
+            value = True
+        elif tag == 'F':
+            value = False
+        elif tag == 'N':
+            value = None
+        elif tag == 'h':
+            value, = _int64.unpack_from(view, index)
+            index += 8
+        elif tag == 'd':
+            value, = _double.unpack_from(view, index)
+            index += 8
+        elif tag == 'b':
+            size, = _int.unpack_from(view, index)
+            index += 4
+            if size < 0 or index + size > end:
+                raise ParseError('Blob exceeds the datagram')
+            value = bytes(view[index:index + size])
+            index += (size + 3) & ~3
+        elif tag == 'r':
+            value, = _uint.unpack_from(view, index)
+            index += 4
+        elif tag == 'm':
+            value = tuple(view[index:index + 4])
+            if len(value) < 4:
+                raise ParseError('Datagram is too short')
+            index += 4
+        elif tag == 't':
+            timetag, = _uint64.unpack_from(view, index)
+            index += 8
+            value = (
+                __NTP_EPOCH__ + datetime.timedelta(seconds = timetag >> 32),
+                timetag & 0xFFFFFFFF
+            )
+        elif tag == '[':
+            array = []
+            stack[-1].append(array)
+            stack.append(array)
+            continue
+        elif tag == ']':
+            if len(stack) < 2:
+                raise ParseError(f"Unexpected closing bracket in type tags {typetags!r}")
+            stack.pop()
+            continue
+        else:
+            logging.warning(f"Unhandled parameter type: {tag}")
+            continue
+        stack[-1].append(value)
+
+    if len(stack) != 1:
+        raise ParseError(f"Missing closing bracket in type tags {typetags!r}")
+    if index > end:
+        raise ParseError('Datagram is too short')
+    return ParsedMessage(address, params, typetags)
@@ -1,11 +1,93 @@
 import asyncio
 import threading
 import collections
+import weakref
+
+from ooposc.addresstree import AddressTree, compile_pattern_segment, __PATTERN_CHARACTERS__
+from ooposc.arrays import np
+from ooposc.parsing import Signature
+
+
+_namespace_lock = threading.Lock()
+
+
+def namespace_version(namespace):
+    """ Incremented whenever an OSC container, or a container nested in it at any depth,
+        gains, replaces or loses a nested container
+    """
+    return getattr(namespace, '__dict__', {}).get('_namespace_version', 0)
+
+
+def _namespace_changed(container, removed = None, added = None):
+    """ Update the parent links of the nested containers that were removed/added &
+        increment the version of container and of every container it's nested in
+
+            Each container keeps (weak) links to the containers it's nested in, so that
+            only the versions of the trees it's part of change.
+    """
+    with _namespace_lock:
+        if removed is not None:
+            parents = _parents(removed)
+            if parents is not None:
+                parents.discard(container)
+        if added is not None:
+            parents = _parents(added, create = True)
+            if parents is not None:
+                parents.add(container)
+
+        pending = [container]
+        seen = set()
+        while pending:
+            node = pending.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            node.__dict__['_namespace_version'] = node.__dict__.get('_namespace_version', 0) + 1
+            pending.extend(node.__dict__.get('_parents', ()))
+
+
+def _parents(namespace, create = False):
+    """ WeakSet of the containers namespace is nested in (None for e.g. classes) """
+    attributes = getattr(namespace, '__dict__', None)
+    if not isinstance(attributes, dict):
+        return None
+    if create:
+        return attributes.setdefault('_parents', weakref.WeakSet())
+    return attributes.get('_parents')
+
+
+_dirty = weakref.WeakSet()  # objects with replicated attributes that changed
+_dirty_lock = threading.Lock()
+
+
+def _mark_dirty(obj, key):
+    with _dirty_lock:
+        obj.__dict__.setdefault('_dirty', set()).add(key)
+        _dirty.add(obj)
+
+
+def _unmark_dirty(obj, key):
+    with _dirty_lock:
+        obj.__dict__.get('_dirty', set()).discard(key)
+
+
+def take_dirty():
+    """ Return [(object, {attribute, ...})] of replicated attributes changed since the last call """
+    with _dirty_lock:
+        objects = list(_dirty)
+        _dirty.clear()
+        return [(obj, obj.__dict__.pop('_dirty', set())) for obj in objects]
+
 
 def dispatchOSC(cls):
-    """ Register a class-level method dispatching class """
+    """ Register a class-level method dispatching class
+
+            The class' handlers are indexed in a single AddressTree, shared by all
+            instances; handlers are only bound to an instance at dispatch time.
+    """
     cls._class_handlers = {}
     cls._class_handlers[cls.__name__] = {}
+    cls._handler_tree = AddressTree()
 
     for methodname in dir(cls):
         method = getattr(cls, methodname)
@@ -23,9 +105,40 @@ def dispatchOSC(cls):
             cls._class_handlers[method._owning_class].update(
                 {method._address: method}
             )
+            if method._address not in cls._handler_tree:
+                cls._handler_tree.insert(method._address, [])
+            cls._handler_tree.handlers(method._address).append(method)
 
     return cls
 
+
+def is_namespace(value):
+    """ Whether value is an OSC container (a dispatchOSC class or an instance of one) """
+    return hasattr(value, '_handler_tree')
+
+
+def namespace_handlers(namespace, segments, depth = 1, literal = True):
+    """ Yield (method, instance) for handlers of namespace and its nested containers
+        that match the '/'-separated OSC pattern segments[depth:]
+    """
+    for method in namespace._handler_tree.match_segments(segments, depth, literal):
+        yield method, namespace
+
+    children = getattr(namespace, '__dict__', {}).get('_children')
+    if not children or depth >= len(segments):
+        return
+
+    segment = segments[depth]
+    if __PATTERN_CHARACTERS__.isdisjoint(segment):
+        child = children.get(segment)
+        if child is not None:
+            yield from namespace_handlers(child, segments, depth + 1, literal)
+    else:
+        pattern = compile_pattern_segment(segment)
+        for key, child in list(children.items()):
+            if pattern.fullmatch(key):
+                yield from namespace_handlers(child, segments, depth + 1, False)
+
 def handleOSC(**kwargs): #
         # todo: it would be better to actually define some 'static' kwargs...
             # i.e.: alias, pass_address, ...
@@ -34,6 +147,11 @@ def handleOSC(**kwargs): #
 
              Usage: @handleOSC()
                     @handleOSC(address = 'alias')
+                    @handleOSC(coalesce = True) -> while busy, only handle the latest pending message
+                    @handleOSC(priority = 10) -> handled before lower priorities when queued (default 0)
+                    @handleOSC(arrays = True) -> array blobs are passed as read-only np.ndarray views
+                    @handleOSC(types = 'ffi') -> only handle messages with exactly these (fixed-size)
+                                                 argument types, decoded without parsing the message
                     @handleOSC(kwarg1 = 1, kwarg2 = 'a', ...) -> constant keyword arguments ~ pythonosc (use case??)
      # todo address must be provided as kwarg, otherwise something happens to the method's reference
     """
@@ -50,10 +168,26 @@ def handleOSC(**kwargs): #
         else:
             func._pass_address = False
 
+        if 'coalesce' in kwargs:  # only the latest message matters, e.g. faders
+            func._coalesce = kwargs['coalesce']
+            del kwargs['coalesce']
+        else:
+            func._coalesce = False
+
         if 'priority' in kwargs:
             func._priority = kwargs['priority']
             del kwargs['priority']
 
+        if 'arrays' in kwargs:
+            if kwargs['arrays'] and np is None:
+                raise ImportError('@handleOSC(arrays = True) requires numpy')
+            func._arrays = kwargs['arrays']
+            del kwargs['arrays']
+
+        if 'types' in kwargs:
+            func._signature = Signature(kwargs['types'])
+            del kwargs['types']
+
         func._kwargs = kwargs
         func._registered = True  # todo: less generic name than _registered
         func._owning_class = func.__qualname__.split('.')[0]
@@ -70,41 +204,51 @@ MethodHandler = collections.namedtuple(
 class DynamicRegistrar:
     """ Instance-level method registering class
 
-            Intercepts all instance attributes: if an instance attribute (value) is registered as an OSC dispatcher,
-            add update self._handler_registry with value._handler_registry
+            Intercepts all instance attributes: if an instance attribute (value) is an OSC container,
+            keep a reference to it in self._children, so that its handlers are found under /attribute/...
 
             Subclass DispatchingObject to define dynamic OSC containers.
+
+            Attributes named in __REPLICATED__ are tracked when they're set, see
+            ooposc.replication.
     """
+    __REPLICATED__ = ()
 
     def __init__(self):
-        self._instance_handlers = {}
-        self._instance_handlers[self.__class__.__name__] = {}
-        """ Add self reference to handlers registered at the class level! """
-        for implementation in self._class_handlers:
-            for method in self._class_handlers[implementation]:
-                if not isinstance(self._class_handlers[implementation][method], tuple):
-                    if implementation not in self._instance_handlers.keys():
-                        self._instance_handlers[implementation] = {}
-                    self._instance_handlers[implementation][method] = (
-                        (self._class_handlers[implementation][method], self)
-                    )
+        # attributes set before calling __init__ are picked up as well
+        self._children = {
+            key: value for key, value in self.__dict__.items() if is_namespace(value)
+        }
+        for child in self._children.values():
+            _namespace_changed(self, added = child)
 
     def __setattr__(self, key, value):
-        if hasattr(value, '_instance_handlers'):
-            # Already registered as (method, instance)
-            for implementation in value._instance_handlers.keys():
-                    for address in value._instance_handlers[implementation]:
-                        reference = value._instance_handlers[implementation][address]
-                        self._instance_handlers[self.__class__.__name__].update(
-                            {"/" + key + address: reference}
-                        )
-        elif hasattr(value, '_class_handlers'):
-            # Need to register (method, instance)
-            for implementation in value._class_handlers.keys():
-                for address in value._class_handlers[implementation]:
-                    method = value._class_handlers[implementation][address]
-                    self._instance_handlers[self.__class__.__name__].update(
-                        {"/" + key + address: (method, value)}
-                    )
-
-        super(DynamicRegistrar, self).__setattr__(key, value)
\ No newline at end of file
+        children = self.__dict__.get('_children')
+        if children is not None:
+            removed = children.pop(key, None)
+            if is_namespace(value):
+                children[key] = value
+            if removed is not None or is_namespace(value):
+                self._children_changed(removed, value if is_namespace(value) else None)
+
+        super(DynamicRegistrar, self).__setattr__(key, value)
+
+        if key in self.__REPLICATED__:
+            _mark_dirty(self, key)
+
+    def __delattr__(self, key):
+        children = self.__dict__.get('_children')
+        if children is not None:
+            removed = children.pop(key, None)
+            if removed is not None:
+                self._children_changed(removed)
+
+        super(DynamicRegistrar, self).__delattr__(key)
+
+        if key in self.__REPLICATED__:
+            _unmark_dirty(self, key)
+
+    def _children_changed(self, removed = None, added = None):
+        if removed is not None and any(child is removed for child in self._children.values()):
+            removed = None  # still nested under another name
+        _namespace_changed(self, removed, added)
@@ -0,0 +1,195 @@
+import contextlib
+import logging
+import threading
+import uuid
+
+from ooposc.register import namespace_version, take_dirty, _mark_dirty
+
+
+class Replicator:
+    """ Replicate the __REPLICATED__ attributes of an OSCApp's containers to other nodes
+
+            Changed attributes are collected every interval seconds and multicast
+            as /_replica/delta messages (sent as one bundle per flush):
+
+                origin, sequence, path, value, path, value, ...
+
+            where path is the attribute's OSC path, e.g. '/mixer/ch1/level', and
+            sequence increases by one per message from an origin. A receiver that
+            sees an origin for the first time, or misses a sequence number, sends
+            /_replica/request [origin, own origin] and gets the origin's complete replicated
+            state back (unicast) as /_replica/state messages, in the same format.
+
+            Values must be OSC-encodable: int, float, str, bytes, bool or None.
+            Only attributes named in the receiving object's __REPLICATED__ are set.
+    """
+    __MAX_UPDATES__ = 32  # (path, value) pairs per message, to stay within a datagram
+
+    def __init__(self, app, interval = 0.05):
+        """
+        :param app:         OSCApp whose container tree is replicated
+        :param interval:    Seconds between flushes of changed attributes
+        """
+        self._app = app
+        self.interval = interval
+        self.origin = uuid.uuid4().hex[:12]
+
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._sequences = {}  # origin -> last sequence number applied
+        self._requested = set()  # origins we've asked for a snapshot
+
+        self._version = None
+        self._paths = {}    # id(object) -> OSC path
+        self._objects = {}  # OSC path -> object
+
+        self.sent = 0
+        self.applied = 0
+        self.gaps = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        if interval:
+            self._thread = threading.Thread(
+                target = self._flush_periodically, name = 'OSCReplicator', daemon = True
+            )
+            self._thread.start()
+
+    def _index(self):
+        """ (Re)build the path <-> object maps when the container tree has changed """
+        version = namespace_version(self._app)
+        if self._version == version:
+            return
+        self._version = version
+        paths = {}
+        objects = {}
+        stack = [('', self._app)]
+        while stack:
+            path, obj = stack.pop()
+            if id(obj) in paths:
+                continue
+            paths[id(obj)] = path
+            objects[path] = obj
+            for key, child in getattr(obj, '__dict__', {}).get('_children', {}).items():
+                stack.append((f"{path}/{key}", child))
+        self._paths = paths
+        self._objects = objects
+
+    def flush(self):
+        """ Multicast the attributes that changed since the last flush (& still exist) """
+        server = getattr(self._app, 'server', None)
+        if server is None:
+            return
+        with self._lock:
+            self._index()
+            updates = []
+            for obj, keys in take_dirty():
+                path = self._paths.get(id(obj))
+                if path is None:  # not (yet) in this app's tree
+                    for key in keys:
+                        _mark_dirty(obj, key)
+                    continue
+                updates += (
+                    (f"{path}/{key}", obj.__dict__[key]) for key in keys if key in obj.__dict__
+                )
+            self._send('/_replica/delta', updates, server)
+
+    def snapshot(self):
+        """ Return [(path, value)] for all replicated attributes in the tree """
+        with self._lock:
+            self._index()
+            return [
+                (f"{path}/{key}", obj.__dict__[key])
+                for path, obj in self._objects.items()
+                for key in getattr(obj, '__REPLICATED__', ()) if key in obj.__dict__
+            ]
+
+    def request_snapshot(self, origin = ''):
+        """ Ask an origin ('' for all of them) for its complete replicated state """
+        server = getattr(self._app, 'server', None)
+        if server is not None:
+            server.send('/_replica/request', [origin, self.origin])
+
+    def _send(self, address, updates, server, *destination):
+        """ Send (path, value) updates, numbered & in chunks; call with the lock held """
+        if not updates:
+            return
+        bundle = getattr(server, 'bundle', None)
+        with bundle() if bundle is not None else contextlib.nullcontext():
+            for i in range(0, len(updates), self.__MAX_UPDATES__):
+                if address == '/_replica/delta':
+                    self._sequence += 1
+                arguments = [self.origin, self._sequence]
+                for path, value in updates[i:i + self.__MAX_UPDATES__]:
+                    arguments += (path, value)
+                server.send(address, arguments, *destination)
+                self.sent += 1
+
+    def _receive_delta(self, client_address, origin, sequence, *updates):
+        if origin == self.origin:  # our own multicast
+            return
+        with self._lock:
+            last = self._sequences.get(origin)
+            if last is not None and sequence <= last:  # duplicate or out of date
+                return
+            if last is None or sequence != last + 1:
+                self.gaps += last is not None
+                if origin not in self._requested:
+                    self._requested.add(origin)
+                    self.request_snapshot(origin)
+            self._sequences[origin] = sequence
+            self._apply(updates)
+    _receive_delta._pass_address = True  # mapped by OSCApp.enable_replication(), not @handleOSC
+    _receive_delta._kwargs = {}
+
+    def _receive_state(self, client_address, origin, sequence, *updates):
+        if origin == self.origin:
+            return
+        with self._lock:
+            self._requested.discard(origin)
+            last = self._sequences.get(origin)
+            if last is not None and sequence < last:  # a newer delta was applied already
+                return
+            self._sequences[origin] = sequence
+            self._apply(updates)
+    _receive_state._pass_address = True
+    _receive_state._kwargs = {}
+
+    def _receive_request(self, client_address, origin = '', requester = ''):
+        if origin not in ('', self.origin) or requester == self.origin:
+            return
+        server = getattr(self._app, 'server', None)
+        if server is None:
+            return
+        updates = self.snapshot()
+        with self._lock:
+            self._send('/_replica/state', updates, server, *client_address)
+    _receive_request._pass_address = True
+    _receive_request._kwargs = {}
+
+    def _apply(self, updates):
+        """ Set replicated attributes without marking them as changed again """
+        self._index()
+        for i in range(0, len(updates) - 1, 2):
+            path, value = updates[i], updates[i + 1]
+            path, _, key = path.rpartition('/')
+            obj = self._objects.get(path)
+            if obj is None or key not in getattr(obj, '__REPLICATED__', ()):
+                logging.debug(f"Not replicating {path}/{key}")
+                continue
+            object.__setattr__(obj, key, value)
+            self.applied += 1
+
+    def close(self):
+        """ Stop flushing periodically & send the last changes """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logging.exception('OSC replication failed')
@@ -0,0 +1,137 @@
+import heapq
+import itertools
+import threading
+import collections
+import logging
+import time
+
+
+SchedulerStats = collections.namedtuple(
+    typename = 'SchedulerStats',
+    field_names = ('depth', 'max_depth', 'scheduled', 'fired', 'late', 'dropped')
+)
+
+
+class TimetagScheduler:
+    """ Run callbacks at a given (time.time()) timestamp on a single worker thread
+
+            Used for OSC bundles with a timetag in the future, so that waiting for
+            them doesn't block the thread handling incoming packets.
+
+            Late policy, for callbacks that are picked up more than late_tolerance
+            seconds after their timestamp (e.g. because a previous one took long),
+            and for bundles that arrive that late, see admit_late():
+                'run':  run anyway
+                'drop': don't run
+                'log':  run anyway, but log a warning
+    """
+    __LATE_POLICIES__ = ('run', 'drop', 'log')
+    __LATE_TOLERANCE__ = 0.005
+
+    def __init__(self, late_policy = 'run', late_tolerance = None):
+        if late_policy not in self.__LATE_POLICIES__:
+            raise ValueError(
+                f"late_policy should be one of {self.__LATE_POLICIES__}, not '{late_policy}'"
+            )
+        if late_tolerance is None:
+            late_tolerance = self.__LATE_TOLERANCE__
+
+        self.late_policy = late_policy
+        self.late_tolerance = late_tolerance
+
+        self._queue = []
+        self._sequence = itertools.count()  # keeps equal timestamps in FIFO order
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        self._max_depth = 0
+        self._scheduled = 0
+        self._fired = 0
+        self._late = 0
+        self._dropped = 0
+
+    def __len__(self):
+        with self._condition:
+            return len(self._queue)
+
+    def schedule(self, timestamp, callback, *args):
+        """ Call callback(*args) at timestamp; starts the worker thread if needed """
+        with self._condition:
+            if not self._running:
+                self._start()
+            heapq.heappush(
+                self._queue, (timestamp, next(self._sequence), callback, args)
+            )
+            self._scheduled += 1
+            self._max_depth = max(self._max_depth, len(self._queue))
+            # only wake up the worker if it now has to fire earlier than planned
+            if self._queue[0][0] == timestamp:
+                self._condition.notify()
+
+    def admit_late(self, timestamp):
+        """ Apply the late policy to something due at timestamp that is handled now,
+            instead of being scheduled; returns whether to handle it
+        """
+        with self._condition:
+            return self._admit(time.time() - timestamp)
+
+    def _admit(self, lag):
+        """ Count & apply the late policy if lag exceeds late_tolerance (call holding _condition) """
+        if lag <= self.late_tolerance:
+            return True
+        self._late += 1
+        if self.late_policy == 'drop':
+            self._dropped += 1
+            return False
+        elif self.late_policy == 'log':
+            logging.warning(f"OSC message is {lag * 1000:.1f} ms late")
+        return True
+
+    def stats(self):
+        """ Return queue depth & counters """
+        with self._condition:
+            return SchedulerStats(
+                len(self._queue), self._max_depth, self._scheduled,
+                self._fired, self._late, self._dropped
+            )
+
+    def stop(self):
+        """ Stop the worker thread, discarding pending callbacks """
+        with self._condition:
+            self._dropped += len(self._queue)
+            self._queue.clear()
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _start(self):
+        self._running = True
+        self._thread = threading.Thread(
+            target = self._run, name = 'TimetagScheduler', daemon = True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and (
+                        not self._queue or self._queue[0][0] > time.time()):
+                    if self._queue:
+                        self._condition.wait(self._queue[0][0] - time.time())
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                timestamp, _, callback, args = heapq.heappop(self._queue)
+
+                if not self._admit(time.time() - timestamp):
+                    continue
+                self._fired += 1
+
+            try:
+                callback(*args)
+            except Exception:
+                logging.exception('Scheduled OSC handler raised an exception')
@@ -0,0 +1,100 @@
+import collections
+import logging
+import socket
+import threading
+
+
+__IOV_MAX__ = 1024  # buffers per sendmsg() call on Linux
+
+
+def buffers(message):
+    """ A datagram as a list of buffers for socket.sendmsg() """
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        return [message]
+    if len(message) > __IOV_MAX__:
+        return [b''.join(message)]
+    return message
+
+
+class SendSockets:
+    """ Connected UDP sockets, one per destination, for sending unicast datagrams
+
+            Connecting resolves the destination once, instead of on every sendto().
+            At most size sockets are kept open; the least recently used one is
+            closed first, as soon as no thread is sending on it anymore.
+
+            Datagrams are sent from an ephemeral port, not from the server's port.
+    """
+    __SIZE__ = 64
+
+    def __init__(self, size = None):
+        if size is None:
+            size = self.__SIZE__
+        self.size = size
+        self._sockets = collections.OrderedDict()  # (address, port) -> [socket, senders, evicted]
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.evicted = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sockets)
+
+    def send(self, message, address, port):
+        """ Send a datagram (bytes, or a list of buffers, sent with scatter-gather I/O) """
+        entry = self._acquire((address, port))
+        try:
+            return entry[0].sendmsg(buffers(message))
+        except ConnectionRefusedError:  # ICMP port unreachable for an earlier datagram
+            logging.debug(f"Nobody listening at {address}:{port}")
+            return 0
+        finally:
+            self._release(entry)
+
+    def _acquire(self, destination):
+        with self._lock:
+            entry = self._sockets.get(destination)
+            if entry is not None:
+                self._sockets.move_to_end(destination)
+                entry[1] += 1
+                return entry
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        try:
+            sock.connect(destination)  # may resolve a host name: not while holding the lock
+        except OSError:
+            sock.close()
+            raise
+
+        with self._lock:
+            entry = self._sockets.get(destination)
+            if entry is not None:  # another thread connected one meanwhile
+                sock.close()
+                self._sockets.move_to_end(destination)
+            else:
+                entry = self._sockets[destination] = [sock, 0, False]
+                self.opened += 1
+                while len(self._sockets) > self.size:
+                    _, evicted = self._sockets.popitem(last = False)
+                    self._evict(evicted)
+            entry[1] += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry[1] -= 1
+            if entry[2] and not entry[1]:
+                entry[0].close()
+
+    def _evict(self, entry):
+        entry[2] = True
+        self.evicted += 1
+        if not entry[1]:
+            entry[0].close()
+
+    def close(self):
+        with self._lock:
+            for entry in self._sockets.values():
+                self._evict(entry)
+            self._sockets.clear()
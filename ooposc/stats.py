@@ -0,0 +1,121 @@
+import threading
+import time
+
+
+class Histogram:
+    """ Log2-bucketed histogram of durations
+
+            Bucket i counts durations of [2^(i-1), 2^i) microseconds, so recording is
+            an int conversion & a bit_length(); percentiles are bucket upper bounds.
+    """
+    __BUCKETS__ = 32  # up to ~35 minutes
+
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * self.__BUCKETS__
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        i = int(seconds * 1e6).bit_length()
+        self.buckets[min(i, self.__BUCKETS__ - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """ Upper bound (in seconds) of the bucket holding the p-th percentile """
+        if not self.count:
+            return 0.0
+        target = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class AddressStats:
+    """ Counters & timing histograms for a single OSC address """
+    __slots__ = ('count', 'resolve', 'wait', 'handler')
+
+    def __init__(self):
+        self.count = 0
+        self.resolve = Histogram()  # address pattern -> handlers
+        self.wait = Histogram()     # waiting in a queue before dispatch
+        self.handler = Histogram()  # running the handlers
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'resolve': self.resolve.snapshot(),
+            'wait': self.wait.snapshot(),
+            'handler': self.handler.snapshot(),
+        }
+
+
+class DispatchStats:
+    """ Per-address dispatch instrumentation for an OSCApp
+
+            Addresses beyond the first max_addresses are counted under OTHER,
+            so that stray addresses can't grow this without bound.
+    """
+    __MAX_ADDRESSES__ = 4096
+    OTHER = '/_other'
+
+    def __init__(self, max_addresses = None):
+        if max_addresses is None:
+            max_addresses = self.__MAX_ADDRESSES__
+        self.max_addresses = max_addresses
+        self.started = time.time()
+        self._addresses = {}
+        self._lock = threading.Lock()
+
+    def _get(self, address):
+        stats = self._addresses.get(address)
+        if stats is None:
+            if len(self._addresses) >= self.max_addresses:
+                address = self.OTHER
+                stats = self._addresses.get(address)
+            if stats is None:
+                stats = self._addresses[address] = AddressStats()
+        return stats
+
+    def record(self, address, resolve, handler = None):
+        """ Record a message: pattern resolution time and, if dispatched, handler time """
+        with self._lock:
+            stats = self._get(address)
+            stats.count += 1
+            stats.resolve.record(resolve)
+            if handler is not None:
+                stats.handler.record(handler)
+
+    def record_wait(self, address, wait):
+        with self._lock:
+            self._get(address).wait.record(wait)
+
+    def snapshot(self):
+        """ Return {address: {'count', 'resolve', 'wait', 'handler'}} """
+        with self._lock:
+            return {
+                address: stats.snapshot() for address, stats in self._addresses.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._addresses.clear()
+            self.started = time.time()
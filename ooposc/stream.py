@@ -0,0 +1,195 @@
+""" OSC over stream sockets: framing & connections, see ooposc.osc.StreamOSC
+
+        slip:       OSC 1.1, packets are SLIP encoded (RFC 1055) between END bytes
+        length:     OSC 1.0, packets are prefixed with their size (int32)
+
+    Decoders parse the stream incrementally, chunk by chunk: packets that are
+    complete within a chunk are views of it, only a packet that spans chunks is
+    collected into a buffer of its own.
+"""
+import struct
+import threading
+
+
+_END = b'\xc0'
+_ESC = b'\xdb'
+_ESC_END = b'\xdb\xdc'
+_ESC_ESC = b'\xdb\xdd'
+
+_size = struct.Struct('>i')
+
+__MAX_PACKET_SIZE__ = 16 * 1024 * 1024
+
+
+def slip_encode(datagram):
+    """ OSC 1.1 framing: END, the escaped datagram, END """
+    datagram = bytes(datagram)
+    if _ESC in datagram or _END in datagram:
+        datagram = datagram.replace(_ESC, _ESC_ESC).replace(_END, _ESC_END)
+    return b''.join((_END, datagram, _END))
+
+
+def length_encode(datagram):
+    """ OSC 1.0 framing: the datagram's size (int32), the datagram """
+    return _size.pack(len(datagram)) + bytes(datagram)
+
+
+class SlipDecoder:
+    """ Split a SLIP encoded stream into packets """
+
+    __slots__ = ('pending', 'max_packet_size')
+
+    def __init__(self, max_packet_size = __MAX_PACKET_SIZE__):
+        self.pending = bytearray()  # (escaped) start of a packet that spans chunks
+        self.max_packet_size = max_packet_size
+
+    def feed(self, data, size = None):
+        """ Yield the packets completed by the first size bytes of data (bytes or bytearray)
+
+                Packets are only valid until the next one is taken.
+                Raises ValueError for packets larger than max_packet_size.
+        """
+        if size is None:
+            size = len(data)
+        start = 0
+        while start < size:
+            end = data.find(_END, start, size)
+            if end < 0:
+                self._keep(data, start, size)
+                return
+            if self.pending:
+                self._keep(data, start, end)
+                yield from self._packet(self.pending, 0, len(self.pending))
+                self.pending.clear()
+            elif end > start:  # not the END that also starts a packet
+                yield from self._packet(data, start, end)
+            start = end + 1
+
+    def _keep(self, data, start, end):
+        self.pending += memoryview(data)[start:end]
+        if len(self.pending) > self.max_packet_size:
+            self.pending.clear()
+            raise ValueError(f"OSC stream packet larger than {self.max_packet_size} bytes")
+
+    @staticmethod
+    def _packet(data, start, end):
+        if data.find(_ESC, start, end) < 0:
+            with memoryview(data) as view:
+                packet = view[start:end]
+                yield packet
+                packet.release()
+        else:
+            yield bytes(data[start:end]).replace(_ESC_END, _END).replace(_ESC_ESC, _ESC)
+
+
+class LengthDecoder:
+    """ Split a stream of size-prefixed packets into packets """
+
+    __slots__ = ('pending', 'max_packet_size')
+
+    def __init__(self, max_packet_size = __MAX_PACKET_SIZE__):
+        self.pending = bytearray()  # size & start of a packet that spans chunks
+        self.max_packet_size = max_packet_size
+
+    def feed(self, data, size = None):
+        """ Yield the packets completed by the first size bytes of data
+
+                Packets are only valid until the next one is taken.
+                Raises ValueError for invalid sizes & packets larger than max_packet_size.
+        """
+        if size is None:
+            size = len(data)
+        pending = self.pending
+        with memoryview(data) as view:
+            start = 0
+            while start < size:
+                if pending:
+                    if len(pending) < _size.size:
+                        start = self._top_up(view, start, size, _size.size)
+                        if len(pending) < _size.size:
+                            return
+                    start = self._top_up(view, start, size, _size.size + self._length(pending, 0))
+                    if len(pending) < _size.size + self._length(pending, 0):
+                        return
+                    if len(pending) > _size.size:
+                        with memoryview(pending) as buffer:
+                            packet = buffer[_size.size:]
+                            yield packet
+                            packet.release()
+                    pending.clear()
+                    continue
+
+                if size - start < _size.size:
+                    pending += view[start:size]
+                    return
+                length = self._length(view, start)
+                if size - start - _size.size < length:
+                    pending += view[start:size]
+                    return
+                start += _size.size
+                if length:
+                    packet = view[start:start + length]
+                    yield packet
+                    packet.release()
+                start += length
+
+    def _top_up(self, view, start, size, length):
+        """ Move bytes from view to pending, until pending is length bytes long """
+        end = min(size, start + length - len(self.pending))
+        self.pending += view[start:end]
+        return end
+
+    def _length(self, data, offset):
+        length = _size.unpack_from(data, offset)[0]
+        if not 0 <= length <= self.max_packet_size:
+            self.pending.clear()
+            raise ValueError(f"Invalid OSC stream packet size: {length}")
+        return length
+
+
+FRAMINGS = {
+    'slip': (slip_encode, SlipDecoder),
+    'length': (length_encode, LengthDecoder),
+}
+
+
+class StreamConnection:
+    """ A non-blocking stream socket, with its decoder & the output not sent yet
+
+            write() & flush() should be called holding lock.
+    """
+
+    __slots__ = ('sock', 'peer', 'decoder', 'output', 'lock')
+
+    def __init__(self, sock, peer, decoder):
+        sock.setblocking(False)
+        self.sock = sock
+        self.peer = peer
+        self.decoder = decoder
+        self.output = bytearray()
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        """ Send as much of data as possible & keep the rest; returns whether output is pending """
+        if not self.output:
+            try:
+                sent = self.sock.send(data)
+            except BlockingIOError:
+                sent = 0
+            if sent == len(data):
+                return False
+            data = memoryview(data)[sent:]
+        self.output += data
+        return True
+
+    def flush(self):
+        """ Send pending output; returns whether some of it is still pending """
+        try:
+            sent = self.sock.send(self.output)
+        except BlockingIOError:
+            return True
+        del self.output[:sent]
+        return bool(self.output)
+
+    def close(self):
+        self.sock.close()
@@ -1,7 +1,34 @@
-import json
+import re
+import socket
+import struct
 import warnings
 from random import randint
 
+
+# VirtualSocketMessage envelope:
+#   magic (2) | version (1) | flags (1) | sender address (4) | sender port (2)
+#   | destination address (4) | destination port (2) | OSC datagram
+__MAGIC__ = b'VS'
+__VERSION__ = 1
+__TO_ADDRESS__ = 0x01  # flag: the message is for a single virtual socket
+
+_header = struct.Struct('>2sBB4sH4sH')
+_virtual_host = re.compile(r'v\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
+
+
+def is_envelope(data):
+    """ Whether data is a VirtualSocketMessage rather than plain OSC (which starts with '/' or '#') """
+    return data[:2] == __MAGIC__
+
+
+def is_virtual(address):
+    """ Whether an (address, port) is a virtual socket's, like ('v192.168.1.2', port) """
+    host = address[0]
+    return isinstance(host, str) and (
+        host in VirtualSocket.__ADDRESSES__ or _virtual_host.fullmatch(host) is not None
+    )
+
+
 class VirtualSocket:
     __ADDRESSES__ = []
 
@@ -30,55 +57,51 @@ class VirtualSocket:
             self.set_address()
 
     def decode(self, data):
-        """ Check if incoming data is formatted correctly """
+        """ Check if incoming data is formatted correctly
+
+                Returns (OSC datagram, sender address), where the datagram is a
+                memoryview of data, or None if data isn't a valid envelope or is
+                addressed to another virtual socket.
+        """
+        view = memoryview(data)
         try:
-            vsm_bundle = json.loads(data)
-            assert isinstance(vsm_bundle, dict)
-            assert sorted(list(vsm_bundle.keys())) \
-                   == sorted(['sender_address', 'to_address', 'data'])
+            magic, version, flags, sender, sender_port, to, to_port = \
+                _header.unpack_from(view)
+        except struct.error:
+            magic = None
+        if magic != __MAGIC__:
+            warnings.warn(f"{bytes(view[:_header.size])} is not a valid VirtualSocketMessage")
+            return None
+        if version != __VERSION__:
+            warnings.warn(f"Unsupported VirtualSocketMessage version {version}")
+            return None
 
-        except (json.decoder.JSONDecodeError, AssertionError):
-            warnings.warn(f"{data} is not a valid VirtualSocketMessage")
+        # filter on destination before touching the payload
+        if flags & __TO_ADDRESS__ and (unpack_address(to, to_port) != self.address):
             return None
+        return view[_header.size:], unpack_address(sender, sender_port)
+
+    def encode(self, data, to_address = None):
+        """ Format outgoing data: a fixed header followed by the raw OSC datagram """
+        return self.envelope(to_address) + data
 
-        if vsm_bundle['to_address'] == self.address \
-                or vsm_bundle['to_address'] == None:
-            return vsm_bundle['data'], tuple(vsm_bundle['sender_address'])
+    def envelope(self, to_address = None):
+        """ Header to send in front of an OSC datagram, e.g. with socket.sendmsg() """
+        if to_address is None:
+            flags, to, to_port = 0, bytes(4), 0
         else:
-            return bytes(''), ('', 0)
+            flags = __TO_ADDRESS__
+            to, to_port = pack_address(to_address)
+        return _header.pack(
+            __MAGIC__, __VERSION__, flags, *pack_address(self.address), to, to_port
+        )
+
+
+def pack_address(address):
+    """ ('v192.168.1.2', port) -> (4 bytes, port) """
+    host, port = address
+    return socket.inet_aton(host.lstrip('v')), port
 
-    def encode(self, data, to_address = None):
-        """ Format outgoing data """
-        # todo: checks on address / data?
-        if type(data) == bytes:
-            data = data.decode('utf-8')
-        return json.dumps(
-            {
-                'sender_address': self.address, 
-                'to_address': to_address, 
-                'data': data
-            }
-        ).encode()
-
-
-def __decode_VSM__(data: (str, bytes)):
-    """ Check if incoming data is formatted correctly """
-    try:
-        vsm_bundle = json.loads(data)
-        assert isinstance(vsm_bundle, dict)
-        assert sorted(list(vsm_bundle.keys())) \
-               == sorted(['sender_address', 'data'])
-
-    except (json.decoder.JSONDecodeError, AssertionError):
-        warnings.warn(f"{data} is not a valid VirtualSocketMessage")
-        return None
-
-    return vsm_bundle['data'], vsm_bundle['sender_address']
-
-def __encode_VSM__(data: (str, bytes), address: str):
-    """ Format outgoing data """
-    # todo: checks on address / data?
-    if type(data) == bytes:
-        data = data.decode('utf-8')
-    return json.dumps({'sender_address': address, 'data': data}).encode()
 
+def unpack_address(host, port):
+    return f"v{socket.inet_ntoa(host)}", port
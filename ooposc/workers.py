@@ -0,0 +1,348 @@
+import threading
+import collections
+import bisect
+import logging
+import time
+import zlib
+
+from ooposc.parsing import osc_address_of
+
+
+PoolStats = collections.namedtuple(
+    typename = 'PoolStats',
+    field_names = (
+        'workers', 'depth', 'submitted', 'completed', 'blocked', 'dropped', 'coalesced', 'shed'
+    )
+)
+
+
+# BoundedQueue.put() outcomes
+QUEUED = 'queued'
+DROPPED = 'dropped'  # the new item, or the oldest one in the queue to make room
+COALESCED = 'coalesced'
+SHED = 'shed'  # low-priority item refused under load
+
+
+def shard_of(data, shards):
+    """ Shard (0 .. shards - 1) for a datagram: crc32 of its (first) OSC address
+
+            crc32 is stable across processes & runs, unlike hash().
+    """
+    return zlib.crc32(osc_address_of(data)) % shards
+
+
+class BoundedQueue:
+    """ FIFO queue with a maximum size & explicit overflow policy
+
+            'block':        wait until there is room
+            'drop-oldest':  discard the item that has been waiting longest
+            'drop-newest':  discard the item being put
+
+            Items that are dropped, coalesced, shed or expire are handed back to
+            discard(item), if given, e.g. to release their resources; it's called
+            without holding the queue's lock.
+    """
+    __OVERFLOW_POLICIES__ = ('block', 'drop-oldest', 'drop-newest')
+
+    def __init__(self, maxsize, overflow = 'block', discard = None):
+        if overflow not in self.__OVERFLOW_POLICIES__:
+            raise ValueError(
+                f"overflow should be one of {self.__OVERFLOW_POLICIES__}, not '{overflow}'"
+            )
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.discard = discard
+        self._items = collections.deque()  # [item, key, priority, time queued] entries
+        self._keyed = {}
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        self.blocked = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.shed = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def put(self, item, key = None, priority = 0):
+        """ Put an item in the queue; returns QUEUED, DROPPED, COALESCED or SHED
+
+                If key is given and an item with the same key is still waiting, that
+                item is replaced, keeping its place in the queue.
+        """
+        outcome, displaced = self._put(item, key, priority)
+        if displaced is not None and self.discard is not None:
+            self.discard(displaced)
+        return outcome
+
+    def _put(self, item, key, priority):
+        """ Returns (outcome, the item that was displaced or refused, or None) """
+        with self._lock:
+            if key is not None:
+                entry = self._keyed.get(key)
+                if entry is not None:
+                    displaced, entry[0] = entry[0], item
+                    self.coalesced += 1
+                    return COALESCED, displaced
+
+            if self._refuse(priority):
+                self.shed += 1
+                return SHED, item
+
+            outcome, displaced = QUEUED, None
+            if self.maxsize and len(self._items) >= self.maxsize:
+                if self.overflow == 'drop-newest':
+                    self.dropped += 1
+                    return DROPPED, item
+                elif self.overflow == 'drop-oldest':
+                    evicted = self._evict()
+                    self._forget(evicted)
+                    self.dropped += 1
+                    outcome, displaced = DROPPED, evicted[0]
+                else:
+                    self.blocked += 1
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._not_full.wait()
+            entry = [item, key, priority, time.monotonic()]
+            if key is not None:
+                self._keyed[key] = entry
+            self._push(entry)
+            self._not_empty.notify()
+            return outcome, displaced
+
+    def get(self):
+        """ Wait for an item; returns None once the queue is closed & empty """
+        while True:
+            item, expired = self._get()
+            if not expired:
+                return item
+            if self.discard is not None:
+                self.discard(item)
+
+    def _get(self):
+        """ Returns (item, whether it expired instead of being returned) """
+        with self._lock:
+            while not self._items:
+                if self._closed:
+                    return None, False
+                self._not_empty.wait()
+            entry = self._pop()
+            self._forget(entry)
+            self._not_full.notify()
+            if self._expired(entry):
+                self.shed += 1
+                return entry[0], True
+            return entry[0], False
+
+    def _push(self, entry):
+        self._items.append(entry)
+
+    def _pop(self):
+        return self._items.popleft()
+
+    def _evict(self):
+        """ Remove & return the entry to drop for 'drop-oldest' """
+        return self._items.popleft()
+
+    def _refuse(self, priority):
+        """ Whether to shed an item with this priority instead of queueing it """
+        return False
+
+    def _expired(self, entry):
+        """ Whether to shed an entry instead of returning it from get() """
+        return False
+
+    def _forget(self, entry):
+        if entry[1] is not None and self._keyed.get(entry[1]) is entry:
+            del self._keyed[entry[1]]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+
+class _PriorityDeques:
+    """ Entries in a FIFO deque per priority
+
+            popleft() takes the longest-waiting entry of the highest priority,
+            popleft_lowest() that of the lowest priority; both are O(1) in the
+            number of entries (O(priorities) when a priority runs empty).
+    """
+    __slots__ = ('_deques', '_priorities', '_size')
+
+    def __init__(self):
+        self._deques = {}  # priority: deque of entries
+        self._priorities = []  # sorted priorities that have entries
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, entry):
+        priority = entry[2]
+        entries = self._deques.get(priority)
+        if entries is None:
+            entries = self._deques[priority] = collections.deque()
+        if not entries:
+            bisect.insort(self._priorities, priority)
+        entries.append(entry)
+        self._size += 1
+
+    def popleft(self):
+        return self._take(self._priorities[-1], -1)
+
+    def popleft_lowest(self):
+        return self._take(self._priorities[0], 0)
+
+    def _take(self, priority, index):
+        entries = self._deques[priority]
+        entry = entries.popleft()
+        if not entries:
+            self._priorities.pop(index)
+        self._size -= 1
+        return entry
+
+
+class PriorityQueue(BoundedQueue):
+    """ Bounded queue that serves higher priorities first, in FIFO order per priority
+
+            Under load, items with a priority of at most shed_priority are shed:
+                - not accepted while shed_depth or more items are waiting
+                - discarded if they have been waiting for longer than max_age seconds
+
+            'drop-oldest' drops the longest-waiting item of the lowest priority.
+    """
+
+    def __init__(self, maxsize, overflow = 'block',
+                 shed_priority = None, shed_depth = None, max_age = None, discard = None):
+        BoundedQueue.__init__(self, maxsize, overflow, discard)
+        if shed_priority is None and (shed_depth or max_age):
+            shed_priority = 0
+        self.shed_priority = shed_priority
+        self.shed_depth = shed_depth
+        self.max_age = max_age
+
+        self._items = _PriorityDeques()
+
+    def _evict(self):
+        return self._items.popleft_lowest()
+
+    def _refuse(self, priority):
+        return bool(
+            self.shed_depth and self.shed_priority is not None
+            and priority <= self.shed_priority and len(self._items) >= self.shed_depth
+        )
+
+    def _expired(self, entry):
+        return bool(
+            self.max_age and self.shed_priority is not None
+            and entry[2] <= self.shed_priority and time.monotonic() - entry[3] > self.max_age
+        )
+
+
+class WorkerPool:
+    """ Fixed number of threads handling requests from bounded queues
+
+            ordered = False:    all workers share one queue
+            ordered = True:     requests are sharded over per-worker queues by OSC
+                                address, so messages for the same address are
+                                handled by the same worker, in arrival order
+
+            With priorities = True, the queues are PriorityQueues; shed_priority,
+            shed_depth and max_age configure their load shedding.
+
+            Requests that are dropped, coalesced or shed are passed to discard(*args),
+            if given, instead of callback(*args).
+    """
+
+    def __init__(self, workers = 4, queue_size = 1024, overflow = 'block', ordered = False,
+                 priorities = False, shed_priority = None, shed_depth = None, max_age = None,
+                 discard = None):
+        self.ordered = ordered
+        self.priorities = priorities
+        self._discard = discard
+
+        def queue():
+            if priorities:
+                return PriorityQueue(
+                    queue_size, overflow, shed_priority, shed_depth, max_age, self._discarded
+                )
+            return BoundedQueue(queue_size, overflow, self._discarded)
+
+        if ordered:
+            self._queues = [queue() for _ in range(workers)]
+        else:
+            self._queues = [queue()]
+
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(
+                target = self._work, args = (self._queues[i % len(self._queues)],),
+                name = f"OSCWorker-{i}", daemon = True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, data, callback, *args, coalesce = None, priority = 0):
+        """ Queue callback(*args) for the datagram data
+
+                Requests submitted with the same coalesce key replace each other
+                while waiting; returns the outcome of BoundedQueue.put()
+        """
+        if self.ordered:
+            queue = self._queues[shard_of(data, len(self._queues))]
+        else:
+            queue = self._queues[0]
+
+        with self._lock:
+            self._submitted += 1
+        return queue.put((callback, args), coalesce, priority)
+
+    def _discarded(self, item):
+        if self._discard is not None:
+            _, args = item
+            try:
+                self._discard(*args)
+            except Exception:
+                logging.exception('Discarding an OSC request raised an exception')
+
+    def stats(self):
+        with self._lock:
+            submitted, completed = self._submitted, self._completed
+        return PoolStats(
+            len(self._threads), sum(len(q) for q in self._queues), submitted, completed,
+            sum(q.blocked for q in self._queues), sum(q.dropped for q in self._queues),
+            sum(q.coalesced for q in self._queues), sum(q.shed for q in self._queues)
+        )
+
+    def shutdown(self, wait = True):
+        """ Stop the workers once the queued requests are handled """
+        for queue in self._queues:
+            queue.close()
+        if wait:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def _work(self, queue):
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            callback, args = item
+            try:
+                callback(*args)
+            except Exception:
+                logging.exception('OSC worker raised an exception')
+            with self._lock:
+                self._completed += 1